@@ -0,0 +1,280 @@
+"""Background asset loading with an on-disk cache of scaled images.
+
+preload_image() and preload_sound() queue files for worker threads to decode
+while the main thread draws a loading screen from progress(). image() and
+sound() hand out the finished asset, finishing the load on the spot if it was
+never queued or is not done yet, so callers never need to know whether
+something was preloaded. Assets only needed late in a run are queued when the
+run gets close to them instead of at startup: csc.py queues the boss images
+and, with preload_music(), the boss track when the miniboss warning starts.
+
+With a cache_dir, every image is also saved after flipping and scaling as raw
+RGBA pixels. Later launches read those back instead of decoding the PNG/JPG
+and scaling it again; a cache entry is used only while the source file's size
+and modification time still match.
+
+A Bundle (built by `python bundle.py`) goes further: every image already
+scaled, every sound as raw samples in the mixer's format and the music files,
+packed into one file behind an index. The manager memory-maps it and makes
+surfaces and sounds straight from the mapped bytes, so a bundled asset costs no
+stat, no open and no decode. Anything not in the bundle is loaded from its
+loose file as before.
+"""
+import io, json, mmap, os, struct
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+# Cache file header: width, height, source mtime (ns), source size
+CACHE_HEADER = struct.Struct("<IIqq")
+
+# Bundle header: magic, version, mixer frequency, sample format, channels, index size
+BUNDLE_HEADER = struct.Struct("<4sBIhBI")
+BUNDLE_MAGIC = b"CSCB"
+BUNDLE_VERSION = 1
+BUNDLE_ALIGN = 64  # every entry starts on a multiple of this
+
+def image_key(name, size, flip_x):
+    w, h = size if size else (0, 0)
+    return f"{name}:{w}x{h}{':flip' if flip_x else ''}"
+
+class MappedFile(io.RawIOBase):
+    """A read-only file over a memoryview, for streaming a bundled file without copying it"""
+    def __init__(self, view):
+        self.view = view
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self.view) - self.pos))
+        b[:n] = self.view[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = (0, self.pos, len(self.view))[whence]
+        self.pos = max(0, base + offset)
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+class Bundle:
+    """Read side of the asset bundle; the index maps each asset to (offset, ...) in the file"""
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            # Copy-on-write, so a surface made from the mapping can still be drawn on
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        self.data = memoryview(self.map)
+        magic, version, freq, fmt, channels, index_size = BUNDLE_HEADER.unpack_from(self.map)
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            raise ValueError(f"{path} is not a version {BUNDLE_VERSION} asset bundle")
+        self.mixer_format = (freq, fmt, channels)
+        index = json.loads(bytes(self.data[BUNDLE_HEADER.size:BUNDLE_HEADER.size + index_size]))
+        self.images = index["images"]  # image_key -> (offset, width, height), RGBA
+        self.sounds = index["sounds"]  # name -> (offset, length) of raw samples
+        self.files = index["files"]  # name -> (offset, length) of the file as it was
+
+    def image(self, name, size=None, flip_x=False):
+        entry = self.images.get(image_key(name, size, flip_x))
+        if entry is None:
+            return None
+        offset, w, h = entry
+        return pygame.image.frombuffer(self.data[offset:offset + w * h * 4], (w, h), "RGBA")
+
+    def sound(self, name):
+        entry = self.sounds.get(name)
+        # The samples only make sense to a mixer opened with the format they were built for
+        if entry is None or pygame.mixer.get_init() != self.mixer_format:
+            return None
+        offset, length = entry
+        return pygame.mixer.Sound(buffer=self.data[offset:offset + length])
+
+    def file(self, name):
+        entry = self.files.get(name)
+        if entry is None:
+            return None
+        offset, length = entry
+        return MappedFile(self.data[offset:offset + length])
+
+def placeholder(size=None):
+    """What a missing image looks like"""
+    surf = pygame.Surface(size if size else (40,40), pygame.SRCALPHA)
+    surf.fill((0,0,0,0))
+    pygame.draw.rect(surf, (200,200,200), surf.get_rect())
+    return surf
+
+class AssetManager:
+    def __init__(self, cache_dir=None, workers=2):
+        self.cache_dir = cache_dir
+        self.bundle = None
+        self.workers = workers
+        self.executor = None
+        self.pending = {}  # key -> Future of an asset still loading
+        self.loaded = {}  # key -> finished asset
+        self.converted = set()  # image keys already in display format
+        self.from_bundle = 0  # images and sounds made from the bundle
+        self.from_cache = 0  # images read back from cache_dir
+        self.decoded = 0  # images decoded and scaled from the source file
+
+    def open_bundle(self, path):
+        """Serve assets from the bundle at path; False if there is no usable one"""
+        try:
+            self.bundle = Bundle(path)
+        except (OSError, ValueError, struct.error):
+            return False
+        return True
+
+    # --- Queueing ---
+    def submit(self, key, load, *args):
+        if key in self.loaded or key in self.pending:
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="assets")
+        self.pending[key] = self.executor.submit(load, *args)
+
+    def preload_image(self, name, size=None, flip_x=False):
+        self.submit(("image", name, size, flip_x), self.read_image, name, size, flip_x)
+
+    def preload_sound(self, name):
+        self.submit(("sound", name), self.read_sound, name)
+
+    def preload_music(self, name):
+        """Read a loose music file into memory ahead of music(name)"""
+        self.submit(("music", name), self.read_music, name)
+
+    def progress(self):
+        """(finished, total) over everything queued so far"""
+        done = len(self.loaded) + sum(1 for f in self.pending.values() if f.done())
+        return done, len(self.loaded) + len(self.pending)
+
+    def ready(self):
+        done, total = self.progress()
+        return done == total
+
+    # --- Fetching ---
+    def fetch(self, key, load, *args):
+        asset = self.loaded.get(key)
+        if asset is None:
+            future = self.pending.pop(key, None)
+            asset = future.result() if future is not None else load(*args)
+            self.loaded[key] = asset
+        return asset
+
+    def image(self, name, size=None, flip_x=False):
+        key = ("image", name, size, flip_x)
+        if key in self.converted:
+            return self.loaded[key]
+        img = self.fetch(key, self.read_image, name, size, flip_x)
+        # convert_alpha needs a video mode; until there is one the raw surface is used
+        if pygame.display.get_surface() is not None:
+            img = self.loaded[key] = img.convert_alpha()
+            self.converted.add(key)
+        return img
+
+    def sound(self, name):
+        return self.fetch(("sound", name), self.read_sound, name)
+
+    def music(self, name):
+        """A file for pygame.mixer.music.load() to stream name from, or None if it is missing
+
+        Given a file rather than a path, the mixer tells the format from the data
+        instead of the extension (boss_music.wav is really an MP3).
+        """
+        if self.bundle is not None:
+            f = self.bundle.file(name)
+            if f is not None:
+                return f
+        key = ("music", name)
+        if key in self.loaded or key in self.pending:
+            data = self.fetch(key, self.read_music, name)
+            if data is not None:
+                return io.BytesIO(data)
+        try:
+            return open(name, "rb")
+        except OSError:
+            return None
+
+    # --- Loading, on worker threads ---
+    def cache_path(self, name, size, flip_x):
+        if self.cache_dir is None:
+            return None
+        w, h = size if size else (0, 0)
+        return os.path.join(self.cache_dir, f"{name}.{w}x{h}{'.flip' if flip_x else ''}.rgba")
+
+    def read_image(self, name, size=None, flip_x=False):
+        if self.bundle is not None:
+            img = self.bundle.image(name, size, flip_x)
+            if img is not None:
+                self.from_bundle += 1
+                return img
+        try:
+            stat = os.stat(name)
+        except OSError:
+            return placeholder(size)
+        path = self.cache_path(name, size, flip_x)
+        if path is not None:
+            img = self.read_cached(path, stat)
+            if img is not None:
+                self.from_cache += 1
+                return img
+        img = pygame.image.load(name)
+        if flip_x:
+            img = pygame.transform.flip(img, True, False)
+        if size:
+            img = pygame.transform.scale(img, size)
+        self.decoded += 1
+        if path is not None:
+            self.write_cached(path, stat, img)
+        return img
+
+    def read_cached(self, path, stat):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            w, h, mtime, length = CACHE_HEADER.unpack_from(data)
+        except (OSError, struct.error):
+            return None
+        pixels = memoryview(data)[CACHE_HEADER.size:]
+        if (mtime, length) != (stat.st_mtime_ns, stat.st_size) or len(pixels) != w * h * 4:
+            return None
+        return pygame.image.frombytes(bytes(pixels), (w, h), "RGBA")
+
+    def write_cached(self, path, stat, img):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(CACHE_HEADER.pack(img.get_width(), img.get_height(), stat.st_mtime_ns, stat.st_size))
+                f.write(pygame.image.tobytes(img, "RGBA"))
+            os.replace(tmp, path)
+        except OSError:
+            pass  # the cache is only a shortcut
+
+    def read_sound(self, name):
+        if self.bundle is not None:
+            sound = self.bundle.sound(name)
+            if sound is not None:
+                self.from_bundle += 1
+                return sound
+        if os.path.exists(name):
+            return pygame.mixer.Sound(name)
+        # Return a silent sound if file not found
+        return pygame.mixer.Sound(buffer=bytearray())
+
+    def read_music(self, name):
+        """The bytes of a music file, or None if it is bundled or missing"""
+        if self.bundle is not None and name in self.bundle.files:
+            return None  # already mapped
+        try:
+            with open(name, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+manager = AssetManager()
@@ -0,0 +1,85 @@
+"""Sound effect playback on reserved mixer channels.
+
+Every effect belongs to a category, and each category owns a few channels
+that nothing else plays on, so a storm of explosions can never cut off the
+hurt sound. Within a category a new sound takes a free channel, or steals the
+channel of the least important sound playing there (the oldest one among
+equals); if everything playing outranks it, the new sound is dropped. A sound
+retriggered within its min_interval is coalesced into the play already
+running instead of starting another voice, which turns a burst of shots or
+kills into a steady rhythm.
+"""
+import pygame
+
+class Voice:
+    __slots__ = ("channel", "priority", "started")
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.priority = 0
+        self.started = 0
+
+class SoundManager:
+    def __init__(self):
+        self.categories = {}  # name -> [Voice]
+        self.effects = {}  # name -> (Sound, category, priority, min_interval ms)
+        self.last_played = {}  # effect name -> get_ticks() of its last play
+        self.played = self.coalesced = self.dropped = self.stolen = 0
+
+    def reserve(self, channels):
+        """Give each category {name: n} n channels of its own"""
+        total = sum(channels.values())
+        pygame.mixer.set_num_channels(total)
+        pygame.mixer.set_reserved(total)
+        first = 0
+        for name, n in channels.items():
+            self.categories[name] = [Voice(pygame.mixer.Channel(i)) for i in range(first, first + n)]
+            first += n
+
+    def add(self, name, sound, category, priority=0, min_interval=0):
+        self.effects[name] = (sound, category, priority, min_interval)
+
+    def play(self, name):
+        """Play an effect; returns the Channel it went to, or None if coalesced or dropped"""
+        sound, category, priority, min_interval = self.effects[name]
+        now = pygame.time.get_ticks()
+        last = self.last_played.get(name)
+        if last is not None and now - last < min_interval:
+            self.coalesced += 1
+            return None
+        voice = self.free_voice(category)
+        if voice is None:
+            voice = self.victim(category, priority)
+            if voice is None:
+                self.dropped += 1
+                return None
+            voice.channel.stop()
+            self.stolen += 1
+        voice.channel.play(sound)
+        voice.priority = priority
+        voice.started = now
+        self.last_played[name] = now
+        self.played += 1
+        return voice.channel
+
+    def free_voice(self, category):
+        for voice in self.categories[category]:
+            if not voice.channel.get_busy():
+                return voice
+        return None
+
+    def victim(self, category, priority):
+        """The voice a sound of this priority may cut off: lowest priority first, then oldest"""
+        candidates = [v for v in self.categories[category] if v.priority <= priority]
+        return min(candidates, key=lambda v: (v.priority, v.started)) if candidates else None
+
+    def stats(self):
+        return {"played": self.played, "coalesced": self.coalesced,
+                "dropped": self.dropped, "stolen": self.stolen}
+
+    def stop(self):
+        for voices in self.categories.values():
+            for voice in voices:
+                voice.channel.stop()
+
+sounds = SoundManager()
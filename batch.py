@@ -0,0 +1,253 @@
+"""Balance sweeps: thousands of headless runs across a process pool.
+
+Every run is a fresh engine.GameWorld with its own seed, played by a bot
+policy until it is won, lost or runs out of frames:
+
+    python batch.py --runs 2000 --seed 1 --policy kite
+    python batch.py --runs 500 --timeline tuned.json --power-up double_shot --out runs.jsonl
+
+The seeds are cut into chunks, and each worker process plays a chunk and
+sends back one small record per run (outcome, when it ended, kills, the HP at
+every second, how far it got). Chunks are handed out a few at a time as
+workers finish, and their records are written to --out and folded into the
+totals as they arrive, so a sweep never holds more than a few chunks in
+flight and the only traffic between processes is the seeds out and the
+records back. Workers share nothing, so throughput should grow with the
+cores, though that has not been measured on a machine with more than one.
+
+What to tune lives in the timeline (spawn rates, enemy archetype hp, boss hp,
+see timeline.py); the power-up the bot picks is --power-up.
+"""
+import argparse, json, math, os, statistics, sys, time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import engine
+import timeline
+from engine import Inputs, WIDTH, HEIGHT, FPS
+
+POWER_UPS = ("scatter_shot", "double_shot")
+PHASES = ("chasers", "shooters", "miniboss", "boss")
+
+# --- Bot policies ---
+# A policy picks the Inputs for step n of a world
+def still(world, n):
+    """Stand where the run starts and keep shooting"""
+    return Inputs(shoot=n % 8 == 0, skill=world.player.skill_cooldown == 0)
+
+def kite(world, n):
+    """Back away from the nearest target while drifting back to the middle,
+    keep shooting and save the skill for crowds and bosses"""
+    player = world.player
+    px, py = player.rect.center
+    # Towards the middle, harder near the walls
+    mx = (WIDTH / 2 - px) / (WIDTH / 2)
+    my = (HEIGHT / 2 - py) / (HEIGHT / 2)
+    target = world.aim_index.nearest((px, py))
+    if target is not None:
+        tx, ty = target.rect.center
+        dx, dy = px - tx, py - ty
+        dist = math.hypot(dx, dy)
+        if 0 < dist < 200:
+            mx += dx / dist
+            my += dy / dist
+    crowd = len(world.aim_index.within((px, py), 120))
+    skill = player.skill_cooldown == 0 and (crowd >= 4 or world.boss_group or world.miniboss_group)
+    return Inputs(up=my < -0.3, down=my > 0.3, left=mx < -0.3, right=mx > 0.3,
+                  shoot=n % 8 == 0, skill=skill)
+
+POLICIES = {"circle": engine.autopilot, "kite": kite, "still": still}
+
+# --- Workers ---
+def init_worker(rules, source, name):
+    """Load assets and the timeline once per worker process"""
+    engine.set_rules(*rules)
+    engine.set_timeline(timeline.parse(source, name))
+    engine.init(headless=True)
+
+def phase(world):
+    """How far the run got, an index into PHASES; it reached the shooters once
+    a segment of its timeline that lets enemies shoot had started"""
+    if world.boss_spawned:
+        return 3
+    if world.miniboss_spawned:
+        return 2
+    return int(any(segment.enemies_shoot for segment in world.timeline.segments
+                   if segment.start <= world.elapsed_time))
+
+def play(seed, policy, power_up, frames):
+    """Play one run and return its record"""
+    world = engine.GameWorld(seed)
+    decide = POLICIES[policy]
+    hp = []
+    n = 0
+    while n < frames and world.game_state == "playing":
+        inputs = decide(world, n)
+        if world.power_up_selection:
+            inputs = inputs._replace(power_up=power_up)
+        world.step(inputs)
+        n += 1
+        if n % FPS == 0:
+            hp.append(world.player.hp)
+    return {"seed": seed,
+            "outcome": "timeout" if world.game_state == "playing" else world.game_state,
+            "time": world.elapsed_time, "frames": n, "kills": world.kills,
+            "phase": PHASES[phase(world)], "hp": hp}
+
+def play_chunk(seeds, policy, power_up, frames):
+    return [play(seed, policy, power_up, frames) for seed in seeds]
+
+# --- Totals ---
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+class Summary:
+    """Running totals over the records of a sweep"""
+    def __init__(self):
+        self.runs = 0
+        self.frames = 0
+        self.outcomes = Counter()
+        self.phases = Counter()
+        self.kills = []
+        self.end_times = {"victory": [], "gameover": []}
+        self.hp_sum = []  # per second: total HP of the runs still going
+        self.hp_runs = []  # per second: how many runs were still going
+
+    def add(self, record):
+        self.runs += 1
+        self.frames += record["frames"]
+        self.outcomes[record["outcome"]] += 1
+        self.phases[record["phase"]] += 1
+        self.kills.append(record["kills"])
+        if record["outcome"] in self.end_times:
+            self.end_times[record["outcome"]].append(record["time"])
+        for second, hp in enumerate(record["hp"]):
+            if second == len(self.hp_sum):
+                self.hp_sum.append(0)
+                self.hp_runs.append(0)
+            self.hp_sum[second] += hp
+            self.hp_runs[second] += 1
+
+    def mean_hp(self, step=10):
+        """{second: mean HP of the runs still going} every step seconds"""
+        return {second + 1: self.hp_sum[second] / self.hp_runs[second]
+                for second in range(step - 1, len(self.hp_sum), step)}
+
+    def report(self):
+        def spread(values):
+            if not values:
+                return {}
+            return {"mean": statistics.fmean(values), "p10": percentile(values, 10),
+                    "p50": percentile(values, 50), "p90": percentile(values, 90)}
+        return {
+            "runs": self.runs,
+            "frames": self.frames,
+            "outcomes": {name: self.outcomes[name] for name in ("victory", "gameover", "timeout")},
+            "phase_reached": {name: self.phases[name] for name in PHASES},
+            "kills": spread(self.kills),
+            "victory_time": spread(self.end_times["victory"]),
+            "death_time": spread(self.end_times["gameover"]),
+            "mean_hp": self.mean_hp(),
+        }
+
+def format_report(report):
+    runs = max(report["runs"], 1)
+    lines = [f"{'outcome':<10} {'runs':>6} {'share':>7}"]
+    for name, count in report["outcomes"].items():
+        lines.append(f"{name:<10} {count:>6} {count / runs:>7.1%}")
+    lines.append(f"{'reached':<10} {'runs':>6} {'share':>7}")
+    for name, count in report["phase_reached"].items():
+        lines.append(f"{name:<10} {count:>6} {count / runs:>7.1%}")
+    lines.append(f"{'':<16} {'mean':>7} {'p10':>6} {'p50':>6} {'p90':>6}")
+    for key, label in (("kills", "kills"), ("victory_time", "victory at (s)"), ("death_time", "death at (s)")):
+        s = report[key]
+        if s:
+            lines.append(f"{label:<16} {s['mean']:>7.1f} {s['p10']:>6} {s['p50']:>6} {s['p90']:>6}")
+    if report["mean_hp"]:
+        lines.append("mean HP of runs still going: " +
+                     "  ".join(f"{second}s {hp:.1f}" for second, hp in report["mean_hp"].items()))
+    return "\n".join(lines)
+
+# --- Sweeps ---
+def sweep(seeds, policy="circle", power_up="scatter_shot", frames=20000, workers=None, chunk=25,
+          rules=None, compiled=None, on_chunk=None):
+    """Play every seed across a pool of worker processes; returns the Summary.
+    on_chunk(records) sees each chunk's records as it comes back."""
+    rules = engine.rules() if rules is None else rules
+    compiled = timeline.load() if compiled is None else compiled
+    workers = workers or os.cpu_count() or 1
+    chunks = (seeds[i:i + chunk] for i in range(0, len(seeds), chunk))
+    summary = Summary()
+    with ProcessPoolExecutor(workers, initializer=init_worker,
+                             initargs=(rules, compiled.source, compiled.name)) as pool:
+        def submit():
+            seeds = next(chunks, None)
+            if seeds is not None:
+                pending.add(pool.submit(play_chunk, seeds, policy, power_up, frames))
+        pending = set()
+        # Enough chunks queued to keep every worker busy, not the whole sweep
+        for _ in range(2 * workers):
+            submit()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                records = future.result()
+                for record in records:
+                    summary.add(record)
+                if on_chunk is not None:
+                    on_chunk(records)
+                submit()
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play many headless runs across a process pool and sum them up")
+    parser.add_argument("--runs", type=int, default=1000, help="how many runs to play")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the first run; the others count up from it")
+    parser.add_argument("--frames", type=int, default=20000, help="give up on a run after this many frames")
+    parser.add_argument("--policy", choices=POLICIES, default="circle", help="the bot that plays")
+    parser.add_argument("--power-up", choices=POWER_UPS, default="scatter_shot", help="what the bot picks before the miniboss")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--chunk", type=int, default=25, help="runs per task handed to a worker")
+    parser.add_argument("--aim", choices=engine.AIM_MODES, default="nearest", help="auto-aim mode")
+    parser.add_argument("--steering", choices=engine.STEERING_MODES, default="direct", help="how chasing enemies move")
+    parser.add_argument("--separation", action="store_true", help="keep chasing enemies from piling up")
+    parser.add_argument("--timeline", default=timeline.DEFAULT_PATH, help="waves and bosses to play")
+    parser.add_argument("--out", help="write every run's record to this file as JSON lines")
+    parser.add_argument("--json", help="write the totals to this file")
+    args = parser.parse_args(argv)
+
+    seeds = list(range(args.seed, args.seed + args.runs))
+    out = open(args.out, "w", encoding="utf-8") if args.out else None
+    t0 = time.perf_counter()
+    done = 0
+
+    def on_chunk(records):
+        nonlocal done
+        done += len(records)
+        if out is not None:
+            out.writelines(json.dumps(record) + "\n" for record in records)
+        secs = time.perf_counter() - t0
+        print(f"\r{done}/{len(seeds)} runs, {done / max(secs, 1e-9):.1f} runs/s", end="", file=sys.stderr, flush=True)
+
+    try:
+        summary = sweep(seeds, args.policy, args.power_up, args.frames, args.workers, args.chunk,
+                        (args.aim, args.steering, args.separation), timeline.load(args.timeline), on_chunk)
+    finally:
+        if out is not None:
+            out.close()
+    secs = time.perf_counter() - t0
+    print(file=sys.stderr)
+    print(f"{summary.runs} runs in {secs:.1f}s ({summary.runs / max(secs, 1e-9):.1f} runs/s, "
+          f"{summary.frames / max(secs, 1e-9):.0f} steps/s) with {args.workers or os.cpu_count()} workers, "
+          f"policy {args.policy}, power-up {args.power_up}, timeline {args.timeline}")
+    report = summary.report()
+    print(format_report(report))
+    if args.json:
+        report.update(policy=args.policy, power_up=args.power_up, timeline=args.timeline, seed=args.seed,
+                      rules=[args.aim, args.steering, args.separation], seconds=secs)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,520 @@
+"""Performance benchmarks for Crystal Slime Chronicles.
+
+Everything runs headless on the real engine classes:
+
+    python benchmark.py collisions
+    python benchmark.py aim
+    python benchmark.py enemies
+    python benchmark.py swarm
+    python benchmark.py timers
+    python benchmark.py projectiles
+    python benchmark.py surfaces
+    python benchmark.py scenarios --json results.json
+    python benchmark.py startup
+"""
+import argparse, json, os, platform, random, subprocess, tempfile, time
+
+import pygame
+
+import assets
+import bundle
+import engine
+import gfx
+import manifest
+import render
+import scheduler
+from engine import WIDTH, HEIGHT, FPS
+from spatial import SpatialHash
+
+def time_ms(fn, repeat):
+    """Mean wall time of fn() in milliseconds"""
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) * 1000 / repeat
+
+def scatter(sprite):
+    """Move a freshly built sprite to a random point in the arena"""
+    sprite.pos = pygame.Vector2(random.randint(0, WIDTH), random.randint(0, HEIGHT))
+    sprite.rect.center = sprite.pos
+    return sprite
+
+# --- Player bullets vs enemies ---
+def collide_naive(bullets, enemies, minibosses, bosses):
+    """The original per-bullet check against every sprite of all three groups"""
+    hits = 0
+    for bullet in bullets:
+        for group in (enemies, minibosses, bosses):
+            hits += sum(1 for sprite in group if bullet.colliderect(sprite.rect))
+    return hits
+
+def collide_grid(grid, bullets, enemies, minibosses, bosses):
+    """Rebuild the spatial hash and query it once per bullet, as GameWorld.step does"""
+    grid.rebuild(enemies, minibosses, bosses)
+    hits = 0
+    for bullet in bullets:
+        hits += len(grid.query_collide(bullet))
+    return hits
+
+def bench_collisions(counts, repeat):
+    engine.init(headless=True)
+    world = engine.reset_game()
+    grid = SpatialHash()
+    print(f"{'entities':>9} {'bullets':>8} {'naive ms':>9} {'grid ms':>8} {'speedup':>8}")
+    rows = []
+    for n in counts:
+        random.seed(n)
+        enemies = pygame.sprite.Group([scatter(engine.Enemy(world)) for _ in range(n)])
+        minibosses = pygame.sprite.Group(engine.MiniBoss(world))
+        bosses = pygame.sprite.Group(engine.Boss(world))
+        # Scatter shot fires five at a time; keep the bullet count in step.
+        # Bullets live in a ProjectilePool, which hands out their rects.
+        bullets = [pygame.Rect(random.randint(0, WIDTH), random.randint(0, HEIGHT), 8, 8) for _ in range(n)]
+
+        assert collide_naive(bullets, enemies, minibosses, bosses) == \
+            collide_grid(grid, bullets, enemies, minibosses, bosses)
+        naive = time_ms(lambda: collide_naive(bullets, enemies, minibosses, bosses), repeat)
+        grid_ms = time_ms(lambda: collide_grid(grid, bullets, enemies, minibosses, bosses), repeat)
+        print(f"{n:>9} {len(bullets):>8} {naive:>9.3f} {grid_ms:>8.3f} {naive / grid_ms:>7.1f}x")
+        rows.append({"entities": n, "bullets": len(bullets), "naive_ms": naive, "grid_ms": grid_ms})
+    return rows
+
+# --- Auto-aim target selection ---
+def pick_linear(world, origin, mode):
+    """What GameWorld.pick_target returns, found by one pass over every target like Player.shoot used to"""
+    ox, oy = origin
+    targets = list(world.enemies_group) + list(world.miniboss_group) + list(world.boss_group)
+    dist2 = lambda s: (s.rect.centerx - ox) ** 2 + (s.rect.centery - oy) ** 2
+    if mode in ("weakest", "threat"):
+        near = [s for s in targets if dist2(s) <= engine.AIM_RADIUS ** 2]
+        if near:
+            if mode == "weakest":
+                return min(near, key=lambda s: (s.hp, dist2(s) ** 0.5))
+            return max(near, key=lambda s: engine.threat(s) / (1 + dist2(s) ** 0.5 / 100))
+    return min(targets, key=dist2) if targets else None
+
+def bench_aim(counts, shots):
+    """Per shot: a linear scan, the index filed again and queried, as every
+    shot after the targets moved is in the game, and a query on a filing
+    that is still current"""
+    engine.init(headless=True)
+    print(f"{'targets':>8} {'mode':<8} {'linear us':>10} {'filed us':>9} {'then us':>8}")
+    rows = []
+    for n in counts:
+        random.seed(n)
+        world = engine.reset_game(n)
+        fill_enemies(world, n)
+        for enemy in world.enemies_group:
+            enemy.hp = random.randint(1, 3)
+        world.miniboss_group.add(scatter(engine.MiniBoss(world)))
+        origins = [(random.randint(0, WIDTH), random.randint(0, HEIGHT)) for _ in range(shots)]
+        index = world.aim_index
+        def filed(o):
+            index.moved()
+            return world.aim_point(o, 10)
+        for mode in engine.AIM_MODES:
+            world.aim_mode = mode
+            # Lead aims at the nearest target, then works out the intercept
+            linear_mode = "nearest" if mode == "lead" else mode
+            assert all(pick_linear(world, o, linear_mode) is world.pick_target(o) for o in origins)
+            linear = time_ms(lambda: [pick_linear(world, o, linear_mode) for o in origins], 3) * 1000 / shots
+            first = time_ms(lambda: [filed(o) for o in origins], 3) * 1000 / shots
+            then = time_ms(lambda: [world.aim_point(o, 10) for o in origins], 3) * 1000 / shots
+            print(f"{n:>8} {mode:<8} {linear:>10.1f} {first:>9.1f} {then:>8.1f}")
+            rows.append({"targets": n, "mode": mode, "linear_us": linear, "filed_us": first, "then_us": then})
+    return rows
+
+# --- Batched enemy movement ---
+def bench_enemies(counts, frames):
+    """Time enemy_controller.update with N enemies, a quarter of them stationary,
+    while every enemy shoots"""
+    engine.init(headless=True)
+    print(f"{'enemies':>8} {'ms/frame':>9} {'us/enemy':>9}")
+    rows = []
+    for n in counts:
+        random.seed(n)
+        world = engine.reset_game(n)
+        while len(world.enemies_group) < n:
+            enemy = scatter(world.enemy_pool.acquire(stationary=len(world.enemies_group) % 4 == 0))
+            if enemy.stationary:
+                enemy.area_center = enemy.pos.copy()
+            world.enemies_group.add(enemy)
+
+        def frame():
+            world.enemy_controller.update(world.player.pos, world.hostile_shots, True)
+            world.hostile_shots.clear()
+        ms = time_ms(frame, frames)
+        print(f"{n:>8} {ms:>9.3f} {ms * 1000 / n:>9.2f}")
+        rows.append({"enemies": n, "ms": ms})
+    return rows
+
+# --- Swarm steering ---
+def bench_swarm(counts, frames):
+    """Let N chasers close in on the player for a number of frames under each
+    steering rule; spread is the share of enemies with a 10px cell to themselves"""
+    engine.init(headless=True)
+    print(f"{'enemies':>8} {'steering':>20} {'ms/frame':>9} {'spread':>7}")
+    rows = []
+    for n in counts:
+        for mode, separation in (("direct", False), ("flow", False), ("direct", True), ("flow", True)):
+            engine.set_rules(steering_mode=mode, separation=separation)
+            random.seed(n)
+            world = engine.reset_game(n)
+            while len(world.enemies_group) < n:
+                world.enemies_group.add(scatter(world.enemy_pool.acquire()))
+            controller = world.enemy_controller
+            ms = time_ms(lambda: controller.update(world.player.pos, world.hostile_shots, False), frames)
+            k = len(controller.sprites)
+            cells = set(zip((controller.x[:k] // 10).tolist(), (controller.y[:k] // 10).tolist()))
+            name = mode + (" + separation" if separation else "")
+            print(f"{n:>8} {name:>20} {ms:>9.3f} {len(cells) / k:>7.2f}")
+            rows.append({"enemies": n, "steering": name, "ms": ms, "spread": len(cells) / k})
+    engine.set_rules()
+    return rows
+
+# --- Timed events ---
+def bench_timers(counts, frames):
+    """N timers due at random over the next `frames` ticks: a list scanned every
+    tick (how Boss.exploding_bullets used to work) against the timer heap"""
+    print(f"{'timers':>8} {'list ms':>9} {'heap ms':>9}   (per tick)")
+    rows = []
+    for n in counts:
+        rng = random.Random(n)
+        dues = [rng.randint(1, frames) for _ in range(n)]
+        fired = []
+
+        pending = [(i, due) for i, due in enumerate(dues)]
+        t0 = time.perf_counter()
+        for now in range(1, frames + 1):
+            for item in pending[:]:
+                if now >= item[1]:
+                    fired.append(item[0])
+                    pending.remove(item)
+        scan = (time.perf_counter() - t0) * 1000 / frames
+
+        timers = scheduler.Scheduler()
+        for i, due in enumerate(dues):
+            timers.at(due, fired.append, i)
+        t0 = time.perf_counter()
+        for _ in range(frames):
+            timers.advance()
+            timers.run()
+        heap = (time.perf_counter() - t0) * 1000 / frames
+        print(f"{n:>8} {scan:>9.3f} {heap:>9.3f}")
+        rows.append({"timers": n, "list_ms": scan, "heap_ms": heap})
+    return rows
+
+# --- Projectile pool throughput ---
+def bench_projectiles(counts, frames):
+    """Keep N hostile shots alive, emitting replacements from the arena centre
+    like a bullet-hell boss, and time the per-frame passes"""
+    import numpy as np
+    import projectiles
+
+    engine.init(headless=True)
+    world = engine.reset_game()
+    target = pygame.Surface((WIDTH, HEIGHT))
+    rng = np.random.default_rng(0)
+    # Park the player off to the side so it soaks up a trickle of shots, not the emitter
+    player_rect = world.player.rect.copy()
+    player_rect.center = (WIDTH // 4, HEIGHT // 2)
+    print(f"{'live':>7} {'update ms':>10} {'collide ms':>11} {'draw ms':>8} {'total ms':>9}")
+    rows = []
+    for n in counts:
+        pool = projectiles.ProjectilePool()
+        update = collide = draw = 0.0
+        for f in range(frames):
+            missing = n - len(pool)
+            if missing > 0:
+                angle = rng.uniform(0, 2 * np.pi, missing)
+                pool.spawn_many(projectiles.BOSS_BULLET, np.full(missing, WIDTH / 2), np.full(missing, HEIGHT / 2),
+                                np.cos(angle), np.sin(angle), rng.uniform(1, 6, missing), lifetime=engine.FPS * 2)
+            t0 = time.perf_counter()
+            pool.update(engine.SCREEN_RECT)
+            t1 = time.perf_counter()
+            pool.remove(pool.hits(player_rect))
+            t2 = time.perf_counter()
+            pool.draw(target)
+            t3 = time.perf_counter()
+            update += t1 - t0; collide += t2 - t1; draw += t3 - t2
+        update, collide, draw = (v * 1000 / frames for v in (update, collide, draw))
+        total = update + collide + draw
+        print(f"{n:>7} {update:>10.3f} {collide:>11.3f} {draw:>8.3f} {total:>9.3f}")
+        rows.append({"live": n, "update_ms": update, "collide_ms": collide, "draw_ms": draw})
+    return rows
+
+def draw_arena(world, target):
+    """Draw the arena the way the game screen does, minus background and HUD"""
+    target.blit(world.player.image, world.player.rect)
+    for group in world.draw_groups:
+        group.draw(target)
+        for shots, kinds in world.draw_shots[group]:
+            shots.draw(target, kinds=kinds)
+
+# --- Surface allocations while firing ---
+def bench_surfaces(frames, seed):
+    """Play a run with the autopilot, drawing every frame, and count how many
+    cached surfaces get built once the game is running"""
+    engine.init(headless=True)
+    world = engine.reset_game(seed)
+    target = pygame.Surface((WIDTH, HEIGHT))
+    before = gfx.surfaces.stats()
+    n = 0
+    while n < frames and world.game_state == "playing":
+        world.step(engine.autopilot(world, n))
+        draw_arena(world, target)
+        n += 1
+    after = gfx.surfaces.stats()
+    new = after["allocations"] - before["allocations"]
+    print(f"{n} frames, cache before {before}, after {after}")
+    print(f"new surfaces during play: {new}")
+    return {"frames": n, "new_surfaces": new, "before": before, "after": after}
+
+# --- Scripted scenarios ---
+# Each scenario puts the engine into one demanding situation and returns a
+# function called before every step to keep it there. The player cannot die.
+BUDGET_MS = 1000 / FPS
+
+def skip_to(world, seconds):
+    """Make the run look like it has been going for that many seconds"""
+    world.start_time = world.get_ticks() - seconds * 1000
+    world.elapsed_time = seconds
+
+def fill_enemies(world, count, stationary=False):
+    while len(world.enemies_group) < count:
+        world.enemies_group.add(scatter(world.enemy_pool.acquire(stationary=stationary)))
+
+def scenario_phase2_shooting(world):
+    """Phase 2: every enemy fires sonic waves at the player"""
+    skip_to(world, 35)
+    fill_enemies(world, 40)
+    return lambda n: fill_enemies(world, 40)
+
+def scenario_miniboss_bomb_storm(world):
+    """The MiniBoss calling down bombs twelve times as often as usual"""
+    skip_to(world, 65)
+    world.miniboss_spawned = True
+    miniboss = engine.MiniBoss(world)
+    miniboss.hp = miniboss.max_hp = 10**9
+    world.miniboss_group.add(miniboss)
+    def keep_bombing(n):
+        if n % 15 == 0:
+            miniboss.drop_bombs()
+    return keep_bombing
+
+def scenario_boss_summon_loop(world):
+    """Boss phase 2 summoning exploding enemies, with the summons sped up"""
+    skip_to(world, 65)
+    world.miniboss_spawned = world.boss_spawned = True
+    boss = engine.Boss(world)
+    boss.max_hp = 10**9
+    boss.hp = boss.max_hp // 2
+    world.boss_group.add(boss)
+    def keep_summoning(n):
+        if boss.state == "phase2_attack1":
+            world.timers.cancel(boss.switch)  # summon for good
+            if n % 15 == 0:
+                boss.summon_enemies(2)
+    return keep_summoning
+
+def scenario_scatter_max_enemies(world):
+    """Scatter shot fired every frame into a full house of chasing enemies"""
+    skip_to(world, 10)
+    world.player.scatter_shot = True
+    fill_enemies(world, 200)
+    return lambda n: fill_enemies(world, 200)
+
+SCENARIOS = {
+    "phase2_shooting": scenario_phase2_shooting,
+    "miniboss_bomb_storm": scenario_miniboss_bomb_storm,
+    "boss_summon_loop": scenario_boss_summon_loop,
+    "scatter_max_enemies": scenario_scatter_max_enemies,
+    "paused": None,  # the phase 2 scene, paused
+}
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+def run_scenario(name, frames, warmup, seed):
+    world = engine.reset_game(seed)
+    world.player.hp = world.player.max_hp = 10**9
+    target = pygame.display.get_surface()
+    setup = SCENARIOS[name] or scenario_phase2_shooting
+    tick = setup(world)
+    update, collide, draw = [], [], []
+    if name == "paused":
+        renderer = render.DirtyRenderer(target)
+        background = engine.load_image("background.jpg", (WIDTH, HEIGHT))
+        def pause_backdrop(surface):
+            surface.blit(background, (0, 0))
+            render.draw_paused(surface, world)
+    for n in range(warmup + frames):
+        if name == "paused":
+            # What the game screen does while paused: the backdrop is composited
+            # when pause starts and then only blitted; nothing is updated or collided
+            t0 = t1 = t2 = time.perf_counter()
+            if n >= warmup:
+                renderer.set_backdrop(("playing", True), pause_backdrop)
+                renderer.begin()
+            else:
+                tick(n)
+                world.step(engine.autopilot(world, n))
+        else:
+            tick(n)
+            inputs = engine.autopilot(world, n)
+            if name == "scatter_max_enemies":
+                inputs = inputs._replace(shoot=True)
+            t0 = time.perf_counter()
+            world.update_world(inputs)
+            t1 = time.perf_counter()
+            world.resolve_collisions()
+            t2 = time.perf_counter()
+            draw_arena(world, target)
+        t3 = time.perf_counter()
+        if n >= warmup:
+            update.append((t1 - t0) * 1000)
+            collide.append((t2 - t1) * 1000)
+            draw.append((t3 - t2) * 1000)
+    frame_ms = [u + c + d for u, c, d in zip(update, collide, draw)]
+    return {
+        "frames": frames,
+        "update_ms": sum(update) / frames,
+        "collision_ms": sum(collide) / frames,
+        "draw_ms": sum(draw) / frames,
+        "p50_ms": percentile(frame_ms, 50),
+        "p95_ms": percentile(frame_ms, 95),
+        "p99_ms": percentile(frame_ms, 99),
+        "max_ms": max(frame_ms),
+        "over_budget": sum(1 for ms in frame_ms if ms > BUDGET_MS),
+        "entities": len(world.enemies_group) + len(world.bombs_group) + len(world.explosions_group),
+        "projectiles": len(world.player_shots) + len(world.hostile_shots),
+    }
+
+def init_display():
+    """Headless, but with a video mode so sprites are converted like in the game"""
+    engine.init(headless=True)
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    engine.load_assets()
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def bench_scenarios(names, frames, warmup, seed, json_path):
+    init_display()
+    print(f"{'scenario':<22} {'update':>7} {'collide':>8} {'draw':>7} {'p50':>7} {'p95':>7} {'p99':>7} "
+          f"{'>budget':>8}   (ms per frame, budget {BUDGET_MS:.1f})")
+    results = {}
+    for name in names:
+        r = results[name] = run_scenario(name, frames, warmup, seed)
+        print(f"{name:<22} {r['update_ms']:>7.3f} {r['collision_ms']:>8.3f} {r['draw_ms']:>7.3f} "
+              f"{r['p50_ms']:>7.3f} {r['p95_ms']:>7.3f} {r['p99_ms']:>7.3f} {r['over_budget']:>8}")
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "seed": seed,
+        "budget_ms": BUDGET_MS,
+        "scenarios": results,
+    }
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {json_path}")
+    return report
+
+def load_startup_assets(manager, background):
+    """Load everything the game needs before the title screen; returns milliseconds"""
+    t0 = time.perf_counter()
+    if background:
+        for spec in manifest.IMAGES:
+            manager.preload_image(*spec)
+        for name in manifest.SOUNDS:
+            manager.preload_sound(name)
+    for spec in manifest.IMAGES:
+        manager.image(*spec)
+    for name in manifest.SOUNDS:
+        manager.sound(name)
+    return (time.perf_counter() - t0) * 1000
+
+def bench_startup(repeat):
+    engine.init(headless=True)
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    rows = {"one by one, no cache": [], "background, cold cache": [], "background, warm cache": [],
+            "bundle": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle_path = os.path.join(tmp, "assets.bundle")
+        bundle.build(bundle_path)
+        for trial in range(repeat):
+            rows["one by one, no cache"].append(load_startup_assets(assets.AssetManager(), False))
+            cache_dir = os.path.join(tmp, f"cache{trial}")
+            rows["background, cold cache"].append(load_startup_assets(assets.AssetManager(cache_dir), True))
+            rows["background, warm cache"].append(load_startup_assets(assets.AssetManager(cache_dir), True))
+            manager = assets.AssetManager()
+            t0 = time.perf_counter()
+            manager.open_bundle(bundle_path)
+            rows["bundle"].append((time.perf_counter() - t0) * 1000 + load_startup_assets(manager, False))
+    print(f"{len(manifest.IMAGES)} images, {len(manifest.SOUNDS)} sounds, best of {repeat}")
+    for label, times in rows.items():
+        print(f"{label:<24} {min(times):>8.1f} ms")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crystal Slime Chronicles benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+    p = sub.add_parser("collisions", help="player bullets vs enemies: naive vs spatial hash")
+    p.add_argument("--counts", type=int, nargs="+", default=[25, 50, 100, 200, 400, 800, 1600])
+    p.add_argument("--repeat", type=int, default=20)
+    p = sub.add_parser("aim", help="auto-aim target picking: linear scan vs point index, per aim mode")
+    p.add_argument("--counts", type=int, nargs="+", default=[10, 50, 100, 200, 400, 800])
+    p.add_argument("--shots", type=int, default=500)
+    p = sub.add_parser("enemies", help="batched enemy steering and shooting cost per frame")
+    p.add_argument("--counts", type=int, nargs="+", default=[50, 200, 800, 2000])
+    p.add_argument("--frames", type=int, default=100)
+    p = sub.add_parser("swarm", help="flow-field steering and crowd separation against walking straight at the player")
+    p.add_argument("--counts", type=int, nargs="+", default=[100, 500, 2000])
+    p.add_argument("--frames", type=int, default=200)
+    p = sub.add_parser("timers", help="timed events: a list scanned every tick vs the timer heap")
+    p.add_argument("--counts", type=int, nargs="+", default=[100, 1000, 10000])
+    p.add_argument("--frames", type=int, default=600)
+    p = sub.add_parser("projectiles", help="projectile pool update/collide/draw cost per frame")
+    p.add_argument("--counts", type=int, nargs="+", default=[1000, 5000, 20000, 50000])
+    p.add_argument("--frames", type=int, default=120)
+    p = sub.add_parser("surfaces", help="surface cache allocations during a full run")
+    p.add_argument("--frames", type=int, default=20000)
+    p.add_argument("--seed", type=int, default=1)
+    p = sub.add_parser("scenarios", help="frame-time breakdown of scripted heavy scenes")
+    p.add_argument("names", nargs="*", default=list(SCENARIOS), metavar="scenario",
+                   help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    p.add_argument("--frames", type=int, default=600)
+    p.add_argument("--warmup", type=int, default=120)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--json", help="write the results to this file")
+    p = sub.add_parser("startup", help="asset loading time with and without the image cache and bundle")
+    p.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.bench == "collisions":
+        bench_collisions(args.counts, args.repeat)
+    elif args.bench == "aim":
+        bench_aim(args.counts, args.shots)
+    elif args.bench == "enemies":
+        bench_enemies(args.counts, args.frames)
+    elif args.bench == "swarm":
+        bench_swarm(args.counts, args.frames)
+    elif args.bench == "timers":
+        bench_timers(args.counts, args.frames)
+    elif args.bench == "projectiles":
+        bench_projectiles(args.counts, args.frames)
+    elif args.bench == "surfaces":
+        bench_surfaces(args.frames, args.seed)
+    elif args.bench == "scenarios":
+        bench_scenarios(args.names, args.frames, args.warmup, args.seed, args.json)
+    elif args.bench == "startup":
+        bench_startup(args.repeat)
+
+if __name__ == "__main__":
+    main()
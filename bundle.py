@@ -0,0 +1,80 @@
+"""Build the asset bundle the game loads at startup.
+
+    python bundle.py                    # writes assets.bundle
+    python bundle.py --out other.bundle
+
+Packs every image in manifest.IMAGES and LATE_IMAGES at the size the game uses it, every
+sound as raw samples and the music files into one file (see assets.Bundle).
+Run it again after changing any asset; until then the game keeps showing what
+was packed.
+"""
+import argparse, json, os, time
+
+import pygame
+
+import assets
+import manifest
+
+DEFAULT_PATH = "assets.bundle"
+
+def align(n):
+    return -(-n // assets.BUNDLE_ALIGN) * assets.BUNDLE_ALIGN
+
+def build(path=DEFAULT_PATH):
+    """Write the bundle to path; returns the index"""
+    loader = assets.AssetManager()  # no cache, so every image is decoded fresh
+    blobs = []  # (section, key, payload, extra index fields)
+    for name, size, flip_x in dict.fromkeys(manifest.IMAGES + manifest.LATE_IMAGES):
+        if os.path.exists(name):
+            img = loader.read_image(name, size, flip_x)
+            blobs.append(("images", assets.image_key(name, size, flip_x),
+                          pygame.image.tobytes(img, "RGBA"), img.get_size()))
+    for name in manifest.SOUNDS:
+        if os.path.exists(name):
+            blobs.append(("sounds", name, pygame.mixer.Sound(name).get_raw(), ()))
+    for name in manifest.MUSIC:
+        if os.path.exists(name):
+            with open(name, "rb") as f:
+                blobs.append(("files", name, f.read(), ()))
+
+    # The index holds offsets into the file, which depend on the index's own
+    # size; lay the data out until the index stops growing
+    index_size = 0
+    while True:
+        index = {"images": {}, "sounds": {}, "files": {}}
+        offset = align(assets.BUNDLE_HEADER.size + index_size)
+        for section, key, payload, extra in blobs:
+            index[section][key] = (offset, *extra) if section == "images" else (offset, len(payload))
+            offset = align(offset + len(payload))
+        encoded = json.dumps(index, separators=(",", ":")).encode()
+        if len(encoded) <= index_size:
+            break
+        index_size = len(encoded)
+    encoded = encoded.ljust(index_size)
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(assets.BUNDLE_HEADER.pack(assets.BUNDLE_MAGIC, assets.BUNDLE_VERSION,
+                                          *pygame.mixer.get_init(), index_size))
+        f.write(encoded)
+        for section, key, payload, extra in blobs:
+            f.seek(index[section][key][0])
+            f.write(payload)
+    os.replace(tmp, path)
+    return index
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack the Crystal Slime Chronicles assets into one file")
+    parser.add_argument("--out", default=DEFAULT_PATH)
+    args = parser.parse_args(argv)
+    # Sounds are stored in the format of the mixer the game opens, pygame's default
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.mixer.init()
+    t0 = time.perf_counter()
+    index = build(args.out)
+    print(f"{args.out}: {len(index['images'])} images, {len(index['sounds'])} sounds, "
+          f"{len(index['files'])} music files, {os.path.getsize(args.out) / 1e6:.1f} MB "
+          f"in {time.perf_counter() - t0:.2f}s")
+
+if __name__ == "__main__":
+    main()
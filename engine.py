@@ -0,0 +1,1576 @@
+"""Crystal Slime Chronicles simulation engine.
+
+Everything that decides what happens in a run lives here: the sprites, the
+spawning rules, the collisions and the phase timers. The engine never opens a
+window or plays a sound, so it can be stepped as fast as the CPU allows:
+
+    engine.init(headless=True)
+    world = engine.reset_game()
+    while world.game_state == "playing":
+        world.step(engine.Inputs(right=True, shoot=True))
+
+A run's state all lives in its GameWorld, so any number of runs can share a
+process. csc.py drives the same engine one step per rendered frame.
+"""
+import hashlib, os, random, time
+import math
+from collections import namedtuple
+
+import numpy as np
+import pygame
+
+import assets
+from spatial import SpatialHash, PointIndex
+import projectiles
+import steering
+import scheduler
+import timeline
+import gfx
+from projectiles import ProjectilePool
+import pool
+from pool import Pool, Pooled
+from profiling import profiler
+
+# --- Config ---
+WIDTH, HEIGHT = 900, 700
+FPS = 60
+SCREEN_RECT = pygame.Rect(0, 0, WIDTH, HEIGHT)
+
+# How Player.shoot picks what to aim at:
+#   nearest - the closest target
+#   weakest - the target with the least HP within AIM_RADIUS
+#   threat  - the most dangerous target within AIM_RADIUS, nearer ones first
+#   lead    - the closest target, aimed at where it will be when the bullet arrives
+# Anything else falls back to nearest when nothing is in range.
+AIM_MODES = ("nearest", "weakest", "threat", "lead")
+AIM_RADIUS = 300
+aim_mode = "nearest"
+
+# How chasing enemies get to the player: "direct" walks straight at them,
+# "flow" follows a flow field that is rebuilt when the player changes cell
+# (steering.py). With enemy_separation on they also spread out instead of
+# piling up on each other.
+STEERING_MODES = ("direct", "flow")
+enemy_steering = "direct"
+enemy_separation = False
+SEPARATION_WEIGHT = 1.5  # how much the push away from the crowd counts against the way to the player
+
+# One step of player input. shoot/skill are "pressed this step" (the KEYDOWN
+# events of the windowed game), power_up is the chosen power type or None.
+Inputs = namedtuple("Inputs", "up down left right shoot skill power_up",
+                    defaults=(False, False, False, False, False, False, None))
+NO_INPUT = Inputs()
+
+def inputs_from_keys(keys, shoot=False, skill=False, power_up=None):
+    """Build Inputs from pygame.key.get_pressed()"""
+    return Inputs(
+        up=bool(keys[pygame.K_UP] or keys[pygame.K_w]),
+        down=bool(keys[pygame.K_DOWN] or keys[pygame.K_s]),
+        left=bool(keys[pygame.K_LEFT] or keys[pygame.K_a]),
+        right=bool(keys[pygame.K_RIGHT] or keys[pygame.K_d]),
+        shoot=shoot, skill=skill, power_up=power_up)
+
+# --- Simulation clock ---
+# All game timers run on simulated time (GameWorld.frame) so a step means the
+# same thing at 60 FPS on screen and at thousands of steps per second headless.
+def frame_at(ms):
+    """The first frame whose get_ticks() is at least ms"""
+    return -(-ms * FPS // 1000)
+
+# --- Timers ---
+# Whatever waits for a number of ticks sits in a timer queue instead of
+# counting down every frame. A world's timers run on world time, which stands
+# still while time is frozen for the warnings and the power-up choice; its
+# cues run on every frame and pace the warnings themselves.
+
+# Where in update_world() each kind of timer runs, so a timer does what it
+# did when it was a counter, at the same point in the tick
+AT_MINIBOSS = 0  # after the miniboss moves
+AT_BOSS = 1  # after the boss moves, before its rect follows
+AT_BOSS_SHOTS = 2  # after the boss update
+AT_BOMBS = 3  # after the bombs pulse
+
+# --- Assets ---
+player_img_right = player_img_left = None
+enemy_img_right = enemy_img_left = None
+health_icon_img = speed_icon_img = None
+
+def load_image(name, size=None, flip_x=False):
+    """Load an image through the asset manager, which may already have it ready"""
+    return assets.manager.image(name, size, flip_x)
+
+# --- Utility: draw simple icons when assets missing ---
+def make_health_icon(size=20):
+    surf = pygame.Surface((size,size), pygame.SRCALPHA)
+    pygame.draw.ellipse(surf, (0,180,0), (0,0,size,size))  # green circle
+    pygame.draw.rect(surf, (255,255,255), (size*0.35, size*0.15, size*0.3, size*0.2))  # neck
+    pygame.draw.line(surf, (255,255,255), (size*0.25,size*0.55),(size*0.75,size*0.55),2)  # cross horiz
+    pygame.draw.line(surf, (255,255,255), (size*0.5,size*0.35),(size*0.5,size*0.75),2)  # cross vert
+    return surf
+
+def make_speed_icon(size=20):
+    surf = pygame.Surface((size,size), pygame.SRCALPHA)
+    # draw simple boot-ish shape
+    pts = [(size*0.1,size*0.7),(size*0.2,size*0.4),(size*0.6,size*0.3),(size*0.8,size*0.5),(size*0.7,size*0.8)]
+    pygame.draw.polygon(surf, (30,144,255), pts)
+    pygame.draw.polygon(surf, (200,200,200), pts, 2)
+    return surf
+
+# (name, size, flip_x) of every sprite image, in the order load_assets() assigns them
+IMAGES = [
+    ("player.png", (60,60), False),
+    ("player.png", (60,60), True),
+    ("enemy.png", (50,50), False),
+    ("enemy.png", (50,50), True),
+]
+# Only loaded when the miniboss or boss first appears; the "miniboss_incoming"
+# and "boss_incoming" events give a frontend time to queue them before that
+MINIBOSS_IMAGE = ("miniboss.png", (160,160), False)
+BOSS_IMAGE = ("boss.png", (200,200), False)
+LATE_IMAGES = [MINIBOSS_IMAGE, BOSS_IMAGE]
+
+def load_assets():
+    """Load the sprite images the simulation needs"""
+    global player_img_right, player_img_left, enemy_img_right, enemy_img_left
+    global health_icon_img, speed_icon_img
+    (player_img_right, player_img_left, enemy_img_right,
+     enemy_img_left) = [load_image(*spec) for spec in IMAGES]
+    health_icon_img = make_health_icon(20)
+    speed_icon_img = make_speed_icon(20)
+    projectiles.prewarm()
+    # Bake the animations the game spawns: miniboss and boss bombs, the boss's
+    # exploding bullets, bomb blasts and phase 3 enemy deaths
+    for warning_time in (90, 180):
+        Bomb.atlas(warning_time)
+    Explosion.atlas(70, 20)
+    for radius in (60, 80):
+        SonicExplosion.atlas(radius, 30)
+
+def init(headless=False):
+    """Initialise pygame and load assets. Headless runs use SDL's dummy drivers."""
+    if headless:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.init()
+    load_assets()
+    if run_timeline is None:
+        load_timeline()
+
+def load_timeline(path=timeline.DEFAULT_PATH):
+    set_timeline(timeline.load(path))
+
+def set_timeline(compiled):
+    """Play runs from now on by a compiled timeline.Timeline"""
+    global run_timeline
+    run_timeline = compiled
+
+# --- Classes ---
+class Player(pygame.sprite.Sprite):
+    def __init__(self, world):
+        super().__init__()
+        self.world = world
+        self.image = player_img_right  # Default facing right
+        self.rect = self.image.get_rect(center=(WIDTH//2, HEIGHT//2))
+        self.pos = pygame.Vector2(self.rect.center)
+        self.base_speed = 5
+        self.speed = self.base_speed
+        self.hp = 10
+        self.max_hp = 10
+        self.last_dir = pygame.Vector2(1,0)  # Default facing right
+        self.facing_right = True
+        self.skill_cooldown = 0  # frames until ready
+        self.speed_end_time = 0  # get_ticks() when speed boost ends
+        self.invincible_end_time = 0  # time when invisibility ends
+        self.knockback_timer = 0  # For knockback effect
+        self.damage_cooldown = 0  # Prevents rapid damage
+
+        # New power-up attributes
+        self.double_shot = False
+        self.scatter_shot = False
+        self.bullet_base_speed = 10
+
+    def update(self, inputs):
+        # Handle knockback first
+        if self.knockback_timer > 0:
+            self.knockback_timer -= 1
+            return  # Skip normal movement during knockback
+
+        # Handle damage cooldown
+        if self.damage_cooldown > 0:
+            self.damage_cooldown -= 1
+
+        move = pygame.Vector2(0,0)
+        moved = False
+
+        if inputs.up:
+            move.y -= 1
+            moved = True
+        if inputs.down:
+            move.y += 1
+            moved = True
+        if inputs.left:
+            move.x -= 1
+            self.last_dir = pygame.Vector2(-1,0)
+            if self.facing_right:  # Changed direction
+                self.facing_right = False
+                self.image = player_img_left
+            moved = True
+        if inputs.right:
+            move.x += 1
+            self.last_dir = pygame.Vector2(1,0)
+            if not self.facing_right:  # Changed direction
+                self.facing_right = True
+                self.image = player_img_right
+            moved = True
+
+        if moved and move.length_squared()>0:
+            move = move.normalize()
+            self.pos += move*self.speed
+            self.pos.x = max(20, min(WIDTH-20, self.pos.x))
+            self.pos.y = max(20, min(HEIGHT-20, self.pos.y))
+            self.rect.center = self.pos
+
+        if self.skill_cooldown>0:
+            self.skill_cooldown -= 1
+        # check speed boost expiry
+        if self.speed > self.base_speed and self.world.get_ticks() > self.speed_end_time:
+            self.speed = self.base_speed
+
+    def apply_knockback(self, direction, strength=10, duration=15):
+        """Apply knockback effect to player"""
+        if self.knockback_timer <= 0:  # Only apply if not already in knockback
+            self.pos += direction.normalize() * strength
+            self.knockback_timer = duration
+            # Ensure player stays on screen
+            self.pos.x = max(20, min(WIDTH-20, self.pos.x))
+            self.pos.y = max(20, min(HEIGHT-20, self.pos.y))
+            self.rect.center = self.pos
+
+    def take_damage(self, amount=1):
+        """Take damage with cooldown to prevent rapid damage"""
+        if self.damage_cooldown <= 0 and self.hp > 0:
+            self.hp = max(0, self.hp - amount)
+            self.damage_cooldown = 30  # 0.5 seconds cooldown
+            self.world.emit("hurt")
+            return True
+        return False
+
+    def shoot(self, shots):
+        bullet_speed = self.bullet_base_speed
+
+        # Auto-aim at an enemy, the miniboss or the boss, as aim_mode decides
+        aim = self.world.aim_point(self.rect.center, bullet_speed)
+
+        if aim is None:
+            # If no targets, aim in last direction
+            if self.scatter_shot:
+                self.fire_scatter_shot(shots, bullet_speed, self.last_dir)
+            elif self.double_shot:
+                # Shoot two bullets slightly spread
+                angle1 = self.last_dir.rotate(-5)
+                angle2 = self.last_dir.rotate(5)
+                shots.spawn(projectiles.PLAYER_BULLET, self.rect.center, angle1, bullet_speed)
+                shots.spawn(projectiles.PLAYER_BULLET, self.rect.center, angle2, bullet_speed)
+            else:
+                shots.spawn(projectiles.PLAYER_BULLET, self.rect.center, self.last_dir, bullet_speed)
+            self.world.emit("shoot")
+            return
+
+        dirv = aim-pygame.Vector2(self.rect.center)
+        if dirv.length_squared()>0:
+            self.last_dir = dirv.normalize()
+            # Update facing direction based on shooting direction
+            if self.last_dir.x < 0 and self.facing_right:
+                self.facing_right = False
+                self.image = player_img_left
+            elif self.last_dir.x > 0 and not self.facing_right:
+                self.facing_right = True
+                self.image = player_img_right
+
+        if self.scatter_shot:
+            self.fire_scatter_shot(shots, bullet_speed, self.last_dir)
+        elif self.double_shot:
+            # Shoot two bullets slightly spread
+            angle1 = self.last_dir.rotate(-5)
+            angle2 = self.last_dir.rotate(5)
+            shots.spawn(projectiles.PLAYER_BULLET, self.rect.center, angle1, bullet_speed)
+            shots.spawn(projectiles.PLAYER_BULLET, self.rect.center, angle2, bullet_speed)
+        else:
+            shots.spawn(projectiles.PLAYER_BULLET, self.rect.center, self.last_dir, bullet_speed)
+        self.world.emit("shoot")
+
+    def fire_scatter_shot(self, shots, bullet_speed, base_direction):
+        """Fire 5 bullets in a wide arc from different positions around player"""
+        # Define firing positions relative to player
+        positions = [
+            self.rect.center,  # Center
+            (self.rect.centerx - 15, self.rect.centery - 15),  # Top-left
+            (self.rect.centerx + 15, self.rect.centery - 15),  # Top-right
+            (self.rect.centerx - 15, self.rect.centery + 15),  # Bottom-left
+            (self.rect.centerx + 15, self.rect.centery + 15)   # Bottom-right
+        ]
+
+        # Define angles for scatter pattern (-30 to +30 degrees)
+        angles = [-30, -15, 0, 15, 30]
+
+        for pos, angle in zip(positions, angles):
+            direction = base_direction.rotate(angle)
+            shots.spawn(projectiles.PLAYER_BULLET, pos, direction, bullet_speed)
+
+    def use_skill(self,enemies_group,hostile_shots,miniboss_group,boss_group):
+        if self.skill_cooldown==0:
+            # clear enemies and bullets (sonic waves from explosions stay)
+            for e in enemies_group: e.kill()
+            hostile_shots.clear((projectiles.ENEMY_WAVE, projectiles.MINIBOSS_WAVE, projectiles.BOSS_BULLET))
+            # miniboss and boss take damage
+            for mb in miniboss_group:
+                mb.hp -= 10  # More damage to miniboss
+                if mb.hp<=0:
+                    mb.kill()
+            for boss in boss_group:
+                boss.hp -= 10  # More damage to boss
+                if boss.hp<=0:
+                    boss.kill()
+            self.skill_cooldown = FPS*12  # 12 sec cooldown
+            self.world.emit("explosion")
+
+    def apply_speed_boost(self, duration_ms=3000):
+        self.speed = self.base_speed * 2
+        now = self.world.get_ticks()
+        self.speed_end_time = now + duration_ms
+        self.invincible_end_time = now + duration_ms
+
+    def apply_power_up(self, power_type):
+        """Apply permanent power-up"""
+        if power_type == "double_shot":
+            self.double_shot = True
+        elif power_type == "scatter_shot":
+            self.scatter_shot = True
+        self.world.emit("powerup")
+
+class Enemy(Pooled, pygame.sprite.Sprite):
+    """While in enemies_group an enemy is moved by enemy_controller; pos,
+    shoot_timer and facing_right are only its state when it spawns"""
+    score = 1  # kills it counts for
+    death_blast = 80  # radius of the sonic blast it leaves once past the first minute
+    wins = False  # whether shooting it down wins the run
+
+    def __init__(self, world, stationary=False):
+        super().__init__()
+        self.world = world
+        self.reset(stationary)
+
+    def reset(self, stationary=False):
+        rng = self.world.rng
+        self.image = enemy_img_right  # Default facing right
+        self.rect = self.image.get_rect()
+        side=rng.choice(['top','bottom','left','right'])
+        if side=='top': self.rect.center=(rng.randint(0,WIDTH),0)
+        elif side=='bottom': self.rect.center=(rng.randint(0,WIDTH),HEIGHT)
+        elif side=='left': self.rect.center=(0,rng.randint(0,HEIGHT))
+        else: self.rect.center=(WIDTH,rng.randint(0,HEIGHT))
+        self.pos=pygame.Vector2(self.rect.center)
+        self.speed=2
+        self.hp=3
+        self.shoot_timer=0
+        self.explodes_on_death = False
+        self.stationary = stationary
+        self.area_center = self.pos.copy() if stationary else None
+        self.wander_radius = 100 if stationary else 0
+        self.facing_right = True
+
+    def velocity(self):
+        """How far it moved in the last update, for lead aiming"""
+        return self.world.enemy_controller.velocity(self)
+
+    def threat(self):
+        if self.explodes_on_death:
+            return 3
+        return 2 if self.stationary else 1
+
+class EnemyController:
+    """Moves and fires every Enemy in enemies_group in one batch.
+
+    Enemy sprites keep what collisions and drawing need (rect, image, hp);
+    their movement state lives here, one NumPy array per field with the
+    enemies packed in enemies_group order. update() chases, wanders, pulls
+    wanderers back into their area, flips facing and fires the volleys of
+    the whole group with array operations, then writes the rects back.
+
+    Removing an enemy only marks its slot dead, so a skill or contact that
+    wipes the whole group costs one pass: compact(), at the next update() or
+    auto-aim filing, packs the survivors to the front in one masked copy.
+    That keeps their order, which decides who gets which random draw and
+    whose volley comes first.
+    """
+    FIELDS = (("x", np.float64), ("y", np.float64),
+              ("ax", np.float64), ("ay", np.float64),  # area_center of stationary enemies
+              ("radius", np.float64), ("speed", np.float64),
+              ("timer", np.int32), ("stationary", bool),
+              ("wanders", bool),  # stationary with an area_center to wander around
+              ("facing", bool),  # facing right
+              ("cx", np.int64), ("cy", np.int64),  # rect center, in whole pixels
+              ("sx", np.int64), ("sy", np.int64),  # how far the rect center moved in the last update
+              ("live", bool))  # still in enemies_group
+
+    def __init__(self, world, capacity=64):
+        self.world = world
+        self.capacity = capacity
+        self.sprites = []  # by slot, removed enemies included until compact()
+        self.slots = {}  # enemy -> its slot in the arrays
+        self.removed = 0
+        for name, dtype in self.FIELDS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    def __len__(self):
+        return len(self.slots)
+
+    def add(self, enemy):
+        """Take over a freshly reset enemy's movement state"""
+        i = len(self.sprites)
+        if i == self.capacity:
+            self.capacity *= 2
+            for name, dtype in self.FIELDS:
+                arr = np.zeros(self.capacity, dtype=dtype)
+                arr[:i] = getattr(self, name)[:i]
+                setattr(self, name, arr)
+        self.sprites.append(enemy)
+        self.slots[enemy] = i
+        self.live[i] = True
+        self.x[i], self.y[i] = enemy.pos
+        self.ax[i], self.ay[i] = enemy.area_center if enemy.stationary else (0, 0)
+        self.radius[i] = enemy.wander_radius
+        self.speed[i] = enemy.speed
+        self.timer[i] = enemy.shoot_timer
+        self.stationary[i] = enemy.stationary
+        # A zero Vector2 is falsy, so an area centered on (0, 0) never wandered
+        self.wanders[i] = enemy.stationary and bool(enemy.area_center)
+        self.facing[i] = enemy.facing_right
+        self.cx[i], self.cy[i] = enemy.rect.center
+        self.sx[i] = self.sy[i] = 0
+
+    def velocity(self, enemy):
+        i = self.slots[enemy]
+        return int(self.sx[i]), int(self.sy[i])
+
+    def remove(self, enemy):
+        self.live[self.slots.pop(enemy)] = False
+        self.removed += 1
+
+    def compact(self):
+        """Pack the enemies still in the group into the first len(self) slots, in order"""
+        if not self.removed:
+            return
+        n = len(self.sprites)
+        keep = self.live[:n].copy()
+        m = n - self.removed
+        for name, _ in self.FIELDS:
+            arr = getattr(self, name)
+            arr[:m] = arr[:n][keep]
+        self.live[m:n] = False
+        self.sprites = [enemy for enemy, kept in zip(self.sprites, keep.tolist()) if kept]
+        self.slots = dict(zip(self.sprites, range(m)))
+        self.removed = 0
+
+    def update(self, player_pos, shots, shooting_enabled):
+        self.compact()
+        n = len(self.sprites)
+        if not n:
+            return
+        world = self.world
+        x = self.x[:n]; y = self.y[:n]; speed = self.speed[:n]
+        facing = self.facing[:n]
+        was_facing = facing.copy()
+        px, py = player_pos
+
+        # Chasers head for the player
+        chase = np.flatnonzero(~self.stationary[:n])
+        if len(chase) and (world.enemy_steering != "direct" or world.enemy_separation):
+            self.steer(chase, player_pos)
+        elif len(chase):
+            dx = px - x[chase]; dy = py - y[chase]
+            length = np.sqrt(dx * dx + dy * dy)
+            go = length > 0
+            chase = chase[go]
+            dx = dx[go] / length[go]; dy = dy[go] / length[go]
+            facing[chase] = np.where(dx < 0, False, np.where(dx > 0, True, facing[chase]))
+            x[chase] += dx * speed[chase]
+            y[chase] += dy * speed[chase]
+
+        # Stationary enemies drift randomly and get pulled back into their area
+        wander = np.flatnonzero(self.wanders[:n])
+        if len(wander):
+            uniform = world.rng.uniform
+            draws = np.array([uniform(-1, 1) for _ in range(2 * len(wander))]).reshape(-1, 2)
+            wx = draws[:, 0]; wy = draws[:, 1]
+            length = np.sqrt(wx * wx + wy * wy)
+            go = length > 0
+            wx = np.where(go, wx / np.where(go, length, 1), wx)
+            wy = np.where(go, wy / np.where(go, length, 1), wy)
+            facing[wander] = np.where(go & (wx < 0), False, np.where(go & (wx > 0), True, facing[wander]))
+            step = speed[wander]
+            x[wander] += wx * step * 0.3
+            y[wander] += wy * step * 0.3
+            bx = self.ax[wander] - x[wander]; by = self.ay[wander] - y[wander]
+            dist = np.sqrt(bx * bx + by * by)
+            back = dist > self.radius[wander]
+            if back.any():
+                wander = wander[back]; bx = bx[back] / dist[back]; by = by[back] / dist[back]
+                step = speed[wander]
+                x[wander] += bx * step * 0.5
+                y[wander] += by * step * 0.5
+
+        # Rects follow the positions, and auto-aim files the enemies by cx, cy
+        for enemy, cx, cy in zip(self.sprites, x.tolist(), y.tolist()):
+            enemy.rect.center = (cx, cy)
+        world.aim_index.moved()
+        cx = projectiles.rect_round(x); cy = projectiles.rect_round(y)
+        self.sx[:n] = cx - self.cx[:n]; self.sy[:n] = cy - self.cy[:n]
+        self.cx[:n] = cx; self.cy[:n] = cy
+
+        # Sonic wave volleys every 1.5 seconds, aimed at the player
+        if shooting_enabled:
+            timer = self.timer[:n]
+            timer += 1
+            fire = np.flatnonzero(timer > 90)
+            if len(fire):
+                timer[fire] = 0
+                dx = px - x[fire]; dy = py - y[fire]
+                length = np.sqrt(dx * dx + dy * dy)
+                go = length > 0
+                dx = np.where(go, dx / np.where(go, length, 1), 0.0)
+                dy = np.where(go, dy / np.where(go, length, 1), 1.0)
+                facing[fire] = np.where(go & (dx < 0), False, np.where(go & (dx > 0), True, facing[fire]))
+                centers = [self.sprites[i].rect.center for i in fire.tolist()]
+                shots.spawn_many(projectiles.ENEMY_WAVE, [c[0] for c in centers], [c[1] for c in centers],
+                                 dx, dy, 4)
+
+        for i in np.flatnonzero(facing != was_facing).tolist():
+            self.sprites[i].image = enemy_img_right if facing[i] else enemy_img_left
+
+    def steer(self, chase, player_pos):
+        """Move the chasers along the flow field and/or away from crowds"""
+        world = self.world
+        x = self.x; y = self.y
+        cx = x[chase]; cy = y[chase]
+        if world.enemy_steering == "flow":
+            world.flow_field.update(player_pos)
+            dx, dy = world.flow_field.sample(cx, cy, player_pos)
+        else:
+            dx = player_pos[0] - cx; dy = player_pos[1] - cy
+            length = np.hypot(dx, dy)
+            length[length == 0] = 1.0
+            dx = dx / length; dy = dy / length
+        if world.enemy_separation:
+            sx, sy = steering.separation(cx, cy, WIDTH, HEIGHT)
+            dx = dx + SEPARATION_WEIGHT * sx
+            dy = dy + SEPARATION_WEIGHT * sy
+        length = np.hypot(dx, dy)
+        go = length > 0
+        chase = chase[go]
+        dx = dx[go] / length[go]; dy = dy[go] / length[go]
+        self.facing[chase] = np.where(dx < 0, False, np.where(dx > 0, True, self.facing[chase]))
+        speed = self.speed[chase]
+        x[chase] += dx * speed
+        y[chase] += dy * speed
+
+# New explosion effect that creates sonic waves
+class SonicExplosion(Pooled, pygame.sprite.Sprite):
+    def __init__(self, world, pos, radius=60, wave_count=6):
+        super().__init__()
+        self.world = world
+        self.reset(pos, radius, wave_count)
+
+    def reset(self, pos, radius=60, wave_count=6):
+        self.damage = 1  # SonicExplosion deals less damage
+        self.pos = pygame.Vector2(pos)
+        self.radius = radius
+        self.lifetime = 30  # frames
+        self.timer = 0
+        self.wave_count = wave_count
+        self.waves_created = False
+        self.frames = self.atlas(radius, self.lifetime)
+        self.image = self.frames[0]
+        self.rect = self.image.get_rect(center=pos)
+
+    @staticmethod
+    def atlas(radius, lifetime):
+        return gfx.atlas(("sonic_explosion", radius, lifetime), lifetime + 1,
+                         lambda timer: SonicExplosion.draw_frame(timer, radius, lifetime))
+
+    @staticmethod
+    def draw_frame(timer, radius, lifetime):
+        image = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
+        progress = timer / lifetime
+        current_radius = int(radius * progress)
+        color = (0, 150, 255, 200 - int(200 * progress))  # Blue explosion
+        pygame.draw.circle(image, color, (radius, radius), current_radius)
+        return image
+
+    def update_image(self):
+        self.image = self.frames[self.timer]
+
+    def update(self):
+        self.timer += 1
+
+        # Create sonic waves once at the start
+        if not self.waves_created and self.timer > 2:
+            self.create_sonic_waves()
+            self.waves_created = True
+
+        self.update_image()
+        if self.timer >= self.lifetime:
+            self.kill()
+
+    def create_sonic_waves(self):
+        for i in range(self.wave_count):
+            angle = i * (360 / self.wave_count)
+            direction = pygame.Vector2(1, 0).rotate(angle)
+            self.world.hostile_shots.spawn(projectiles.BLAST_WAVE, self.pos, direction, 4)
+
+class MiniBoss(pygame.sprite.Sprite):
+    score = 5
+    death_blast = 0
+    wins = False
+
+    def __init__(self, world):
+        super().__init__()
+        self.world = world
+        self.image=load_image(*MINIBOSS_IMAGE)
+        self.rect=self.image.get_rect(center=(WIDTH//2,100))
+        self.pos=pygame.Vector2(self.rect.center)
+        self.speed=2
+        self.last_step = (0, 0)  # how far the rect center moved in the last update
+        self.hp = self.max_hp = world.timeline.boss_hp("miniboss", 200)
+        # It spawns between ticks, so its first update is on the next one
+        self.volleys = self.world.timers.every(121, self.shoot_lines, order=AT_MINIBOSS)  # Every 2 seconds
+        self.bombing = self.world.timers.every(181, self.drop_bombs, order=AT_MINIBOSS)  # Every 3 seconds
+
+    def update(self, player_pos):
+        dirv=(player_pos-self.pos)
+        if dirv.length()>0: dirv=dirv.normalize()
+        self.pos+=dirv*self.speed*0.5
+        self.pos.x=max(50,min(WIDTH-50,self.pos.x))
+        self.pos.y=max(50,min(HEIGHT-50,self.pos.y))
+        x, y = self.rect.center
+        self.rect.center=self.pos
+        self.last_step = (self.rect.centerx - x, self.rect.centery - y)
+        self.world.aim_index.moved()
+
+    def shoot_lines(self):
+        # Shoot lines in all directions
+        for angle in range(0, 360, 45):  # 8 directions
+            direction = pygame.Vector2(1, 0).rotate(angle)
+            self.world.hostile_shots.spawn(projectiles.MINIBOSS_WAVE, self.rect.center, direction, 4)
+
+    def drop_bombs(self):
+        # Create 2-3 bombs at random positions
+        world = self.world
+        for _ in range(world.rng.randint(2, 3)):
+            bomb_pos = (world.rng.randint(100, WIDTH-100), world.rng.randint(100, HEIGHT-100))
+            world.bombs_group.add(world.bomb_pool.acquire(bomb_pos))
+
+    def velocity(self):
+        return self.last_step
+
+    def threat(self):
+        return 4
+
+    def kill(self):
+        self.world.timers.cancel(self.volleys)
+        self.world.timers.cancel(self.bombing)
+        super().kill()
+
+class Boss(pygame.sprite.Sprite):
+    score = 0
+    death_blast = 0
+    wins = True
+
+    def __init__(self, world):
+        super().__init__()
+        self.world = world
+        self.image=load_image(*BOSS_IMAGE)
+        self.rect=self.image.get_rect(center=(WIDTH//2,80))
+        self.pos=pygame.Vector2(self.rect.center)
+        self.hp = self.max_hp = world.timeline.boss_hp("boss", 700)
+        self.last_step = (0, 0)  # how far the rect center moved in the last update
+        self.state="intro"
+        self.attack_phase = 1
+        self.attack = None  # repeating Timer of the current state's attack
+        self.switch = None  # Timer of the next state change
+        self.summon_wait = 90  # ticks to the next summon when phase2_attack1 resumes
+        self.exploding_bullets = {}  # projectile id -> Timer of its explosion, until the bullet goes
+        self.original_pos = pygame.Vector2(WIDTH//2, 80)
+        # It spawns between ticks; the intro lasts 181 updates
+        self.switch = self.world.timers.after(181, self.enter, "attack1", order=AT_BOSS)
+
+    def update(self, player_pos):
+        # Phase transition when HP is half
+        if self.hp <= self.max_hp // 2 and self.attack_phase == 1:
+            self.attack_phase = 2
+            self.world.timers.cancel(self.switch)
+            self.enter("phase2_idle")
+
+        # Movement for the state the boss is in; attacks and state changes are
+        # timers, due after it moves but aimed from where it stood last tick
+        if self.state == "attack1":
+            self.pos = self.original_pos
+        elif self.state == "attack2":
+            dirv = (player_pos - self.pos)
+            if dirv.length() > 0:
+                dirv = dirv.normalize()
+                self.pos += dirv * 1.5
+        elif self.state == "phase2_attack2":
+            target_pos = pygame.Vector2(WIDTH//2, HEIGHT//2)
+            if (self.pos - target_pos).length() > 10:
+                dirv = (target_pos - self.pos)
+                if dirv.length() > 0:
+                    dirv = dirv.normalize()
+                    self.pos += dirv * 3
+            else:
+                self.pos = target_pos
+        self.world.timers.run(AT_BOSS)
+
+        x, y = self.rect.center
+        self.rect.center=self.pos
+        self.last_step = (self.rect.centerx - x, self.rect.centery - y)
+        self.world.aim_index.moved()
+
+    def enter(self, state):
+        """Switch to state, start its attack and set when it ends"""
+        timers = self.world.timers
+        if self.state == "phase2_attack1":
+            self.summon_wait = self.attack.due - timers.now  # summoning picks up where it stopped
+        if state != self.state:  # phase2_attack2 following itself keeps its bombing rhythm
+            timers.cancel(self.attack)
+            self.attack = None
+            if state == "attack1":
+                self.attack = timers.every(100, self.fire_scattered_projectiles, 12, order=AT_BOSS)
+            elif state == "attack2":
+                self.attack = timers.every(180, self.fire_scattered_projectiles, 8, order=AT_BOSS)
+            elif state == "phase2_attack1":
+                self.attack = timers.every(90, self.summon_enemies, 2, delay=self.summon_wait, order=AT_BOSS)
+            elif state == "phase2_attack2":
+                self.attack = timers.every(180, self.summon_bombs, 3, order=AT_BOSS)
+        self.state = state
+
+        if state == "attack1":
+            self.pos = self.original_pos
+            self.switch = timers.after(720, self.enter, "attack2", order=AT_BOSS)
+        elif state == "attack2":
+            self.switch = timers.after(540, self.enter, "attack1", order=AT_BOSS)
+        elif state == "phase2_idle":
+            # The tick of the transition is the first of the 61 idle ones
+            self.switch = timers.after(60, self.enter, "phase2_attack1", order=AT_BOSS)
+        elif state == "phase2_attack1":
+            self.switch = timers.after(1200, self.enter, "phase2_attack2", order=AT_BOSS)
+        elif state == "phase2_attack2":
+            self.switch = timers.after(840, self.choose_attack, order=AT_BOSS)
+
+    def choose_attack(self):
+        self.enter(self.world.rng.choice(["phase2_attack1", "phase2_attack2"]))
+
+    def fire_scattered_projectiles(self, count):
+        world = self.world
+        rng = world.rng
+        for i in range(count):
+            angle = i * (360 / count) + rng.uniform(-15, 15)
+            dirn = pygame.Vector2(1, 0).rotate(angle)
+            # Boss bullets fade out after 2 seconds
+            bullet = world.hostile_shots.spawn(projectiles.BOSS_BULLET, self.rect.center, dirn, 6, lifetime=FPS*2)
+
+            if rng.random() < 0.10:
+                explosion_time = world.get_ticks() + rng.randint(500, 1000)
+                self.exploding_bullets[bullet] = world.timers.after(frame_at(explosion_time) - world.frame,
+                                                                    self.explode_bullet, bullet, order=AT_BOSS_SHOTS)
+                # A bullet that hits something or leaves the screen first never explodes
+                world.hostile_shots.watch(bullet, self.bullet_gone, bullet)
+
+    def bullet_gone(self, bullet):
+        self.world.timers.cancel(self.exploding_bullets.pop(bullet))
+
+    def explode_bullet(self, bullet):
+        del self.exploding_bullets[bullet]
+        world = self.world
+        shots = world.hostile_shots
+        shots.unwatch(bullet)
+        explosion = world.explosion_pool.acquire(shots.position(bullet), 70, 0)  # No damage, just visual
+        world.explosions_group.add(explosion)
+        shots.kill(bullet)
+
+    def summon_enemies(self, count):
+        for _ in range(count):
+            enemy = self.world.enemy_pool.acquire(stationary=False)  # Moving enemies
+            enemy.explodes_on_death = True
+            self.world.enemies_group.add(enemy)
+
+    def summon_bombs(self, count):
+        world = self.world
+        for _ in range(count):
+            bomb_x = world.rng.randint(100, WIDTH-100)
+            bomb_y = world.rng.randint(100, HEIGHT-100)
+            world.bombs_group.add(world.bomb_pool.acquire((bomb_x, bomb_y), warning_time=180))
+
+    def velocity(self):
+        return self.last_step
+
+    def threat(self):
+        return 5
+
+    def kill(self):
+        timers = self.world.timers
+        timers.cancel(self.attack)
+        timers.cancel(self.switch)
+        for bullet, timer in self.exploding_bullets.items():
+            timers.cancel(timer)
+            self.world.hostile_shots.unwatch(bullet)
+        self.exploding_bullets.clear()
+        super().kill()
+
+class Bomb(Pooled, pygame.sprite.Sprite):
+    def __init__(self, world, pos, warning_time=90, explosion_radius=60, damage=1):
+        super().__init__()
+        self.world = world
+        self.reset(pos, warning_time, explosion_radius, damage)
+
+    def reset(self, pos, warning_time=90, explosion_radius=60, damage=1):
+        self.pos = pygame.Vector2(pos)
+        self.warning_time = warning_time
+        self.explosion_radius = explosion_radius
+        self.damage = damage
+        self.timer = 0
+        self.exploded = False
+        # Frames 0..warning_time-1 pulse, the last one is the armed bomb
+        self.frames = self.atlas(warning_time)
+        self.image = self.frames[0]
+        self.rect = self.image.get_rect(center=self.pos)
+        # Bombs are dropped during a tick and first update on that same tick
+        self.lit = self.world.timers.now - 1
+        self.fuse = self.world.timers.after(warning_time + 59, self.detonate, order=AT_BOMBS)
+
+    @staticmethod
+    def atlas(warning_time):
+        return gfx.atlas(("bomb", warning_time), warning_time + 1,
+                         lambda timer: Bomb.draw_frame(timer, warning_time))
+
+    @staticmethod
+    def draw_frame(timer, warning_time):
+        size = 30
+        image = pygame.Surface((size, size), pygame.SRCALPHA)
+
+        if timer < warning_time:
+            pulse = 5 * math.sin(timer * 0.3)
+            pygame.draw.circle(image, (255, 0, 0, 180), (size//2, size//2), size//2 + int(pulse))
+            pygame.draw.circle(image, (255, 255, 255), (size//2, size//2), size//4)
+        else:
+            pygame.draw.circle(image, (255, 0, 0), (size//2, size//2), size//2)
+            pygame.draw.circle(image, (255, 255, 0), (size//2, size//2), size//4)
+        return image
+
+    def update_image(self):
+        self.image = self.frames[min(self.timer, self.warning_time)]
+
+    def update(self):
+        # Only the pulsing is redrawn every tick, the explosion is a timer
+        self.timer = self.world.timers.now - self.lit
+        self.update_image()
+
+    def detonate(self):
+        world = self.world
+        explosion = world.sonic_explosion_pool.acquire(self.rect.center, self.explosion_radius, 8)
+        world.explosions_group.add(explosion)
+        world.emit("explosion")
+        self.kill()
+
+    def kill(self):
+        self.world.timers.cancel(self.fuse)
+        super().kill()
+
+class Explosion(Pooled, pygame.sprite.Sprite):
+    def __init__(self, pos, radius=50, damage=1, duration=20):
+        super().__init__()
+        self.reset(pos, radius, damage, duration)
+
+    def reset(self, pos, radius=50, damage=1, duration=20):
+        self.pos = pygame.Vector2(pos)
+        self.radius = radius
+        self.damage = damage
+        self.lifetime = duration
+        self.timer = 0
+        self.frames = self.atlas(radius, duration)
+        self.image = self.frames[0]
+        self.rect = self.image.get_rect(center=pos)
+
+    @staticmethod
+    def atlas(radius, duration):
+        return gfx.atlas(("explosion", radius, duration), duration + 1,
+                         lambda timer: Explosion.draw_frame(timer, radius, duration))
+
+    @staticmethod
+    def draw_frame(timer, radius, lifetime):
+        image = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
+        progress = timer / lifetime
+        current_radius = int(radius * progress)
+        color = (255, 100, 0, 200 - int(200 * progress))
+        pygame.draw.circle(image, color, (radius, radius), current_radius)
+        pygame.draw.circle(image, (255, 200, 0), (radius, radius), current_radius//2)
+        return image
+
+    def update_image(self):
+        self.image = self.frames[self.timer]
+
+    def update(self):
+        self.timer += 1
+        self.update_image()
+        if self.timer >= self.lifetime:
+            self.kill()
+
+# --- Drops ---
+class HealthPotion(Pooled, pygame.sprite.Sprite):
+    LIFETIME_MS = 5000
+    def __init__(self, world, pos=None):
+        super().__init__()
+        self.world = world
+        self.reset(pos)
+
+    def reset(self, pos=None):
+        self.image = health_icon_img  # shared, never drawn on
+        rng = self.world.rng
+        self.rect = self.image.get_rect(center=pos if pos else (rng.randint(40, WIDTH-40), rng.randint(40, HEIGHT-40)))
+        self.spawn_time = self.world.get_ticks()
+    def update(self):
+        if self.world.get_ticks() - self.spawn_time > self.LIFETIME_MS:
+            self.kill()
+
+    def picked_up(self):
+        player = self.world.player
+        player.hp = min(player.max_hp, player.hp + 1)
+        self.world.emit("powerup")
+
+class SpeedBoost(Pooled, pygame.sprite.Sprite):
+    LIFETIME_MS = 5000
+    def __init__(self, world, pos=None):
+        super().__init__()
+        self.world = world
+        self.reset(pos)
+
+    def reset(self, pos=None):
+        self.image = speed_icon_img  # shared, never drawn on
+        rng = self.world.rng
+        self.rect = self.image.get_rect(center=pos if pos else (rng.randint(40, WIDTH-40), rng.randint(40, HEIGHT-40)))
+        self.spawn_time = self.world.get_ticks()
+    def update(self):
+        if self.world.get_ticks() - self.spawn_time > self.LIFETIME_MS:
+            self.kill()
+
+    def picked_up(self):
+        self.world.player.apply_speed_boost(3000)
+        self.world.emit("powerup")
+
+# --- Groups ---
+class TargetGroup(pygame.sprite.Group):
+    """A Group whose sprites are auto-aim targets; aim_index files them again
+    after one comes or goes"""
+    def __init__(self, aim_index):
+        super().__init__()
+        self.aim_index = aim_index
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.aim_index.moved()
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.aim_index.moved()
+
+class EnemyGroup(TargetGroup):
+    """The enemies, whose movement controller takes over while they are in the group"""
+    def __init__(self, aim_index, controller):
+        super().__init__(aim_index)
+        self.controller = controller
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.controller.add(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.controller.remove(sprite)
+
+# --- Auto-aim ---
+def threat(sprite):
+    """How dangerous a target is, for the threat aim mode"""
+    return sprite.threat()
+
+# --- Entity kinds ---
+# Every kind of sprite in the arena is a Kind: its group plus what the shared
+# systems need to know about it. update_world() updates the kinds in list
+# order, resolve_collisions() shoots the ones in TargetGroups, runs their
+# contact and pickup components, and frontends draw them by layer, so a new
+# kind of enemy is one more entry in GameWorld.kinds rather than another pass
+# anywhere. Projectiles and enemies keep their state in packed arrays
+# (ProjectilePool, EnemyController); the rest are few enough to stay sprites.
+class Kind:
+    def __init__(self, name, group, layer, update, timers=None, contact=None, pickup=False, shots=()):
+        self.name = name
+        self.group = group
+        self.layer = layer  # draw order
+        self.shots = shots  # (ProjectilePool, projectile kinds) drawn right after the group
+        self.update = update  # advances every sprite of the kind by one tick
+        self.timers = timers  # order of the timers to run right after the update
+        self.contact = contact  # GameWorld.crash, shove, blast or None
+        self.pickup = pickup  # touching a sprite collects it: sprite.picked_up()
+
+# --- Interpolation ---
+SNAP_DISTANCE = 48  # farther than this in one step is a teleport (or a recycled sprite)
+
+# --- Worlds ---
+class GameWorld:
+    """One run of the game and everything in it.
+
+    A world owns its clock, random stream, timers, player, sprites, pools,
+    projectiles and run state; the sprites reach the rest of their world
+    through their world attribute. Worlds share nothing but the loaded images,
+    so any number of them can be built and stepped side by side:
+
+        world = engine.GameWorld(seed=1)
+        while world.game_state == "playing":
+            world.step(engine.Inputs(right=True, shoot=True))
+
+    It is played by the compiled timeline and the rules it was built with, by
+    default the ones set with set_timeline() and set_rules().
+    """
+    def __init__(self, seed=None, rules=None, compiled=None):
+        # Every random decision in the rules draws from rng. The seed plus the
+        # Inputs of every step reproduce a run exactly.
+        self.session_seed = random.randrange(2**32) if seed is None else seed
+        self.rng = random.Random(self.session_seed)
+        self.frame = 0
+        if rules is None:
+            rules = (aim_mode, enemy_steering, enemy_separation)
+        self.aim_mode, self.enemy_steering, self.enemy_separation = rules
+        # The waves and bosses of the run, with a cursor of its own
+        self.timeline = (run_timeline if compiled is None else compiled).copy()
+
+        # step() does not play sounds or music itself, it reports what happened
+        # and the frontend decides what to do with it
+        self.events = []
+        self.timers = scheduler.Scheduler()
+        self.cues = scheduler.Scheduler()
+
+        # Short-lived sprites are recycled rather than rebuilt; kill() returns them
+        self.enemy_pool = Pool(Enemy, self)
+        self.bomb_pool = Pool(Bomb, self)
+        self.explosion_pool = Pool(Explosion)
+        self.sonic_explosion_pool = Pool(SonicExplosion, self)
+        self.health_potion_pool = Pool(HealthPotion, self)
+        self.speed_boost_pool = Pool(SpeedBoost, self)
+
+        # Everything auto-aim can pick, found by center. Targets tell it when
+        # they have moved and TargetGroups when one comes or goes, and the
+        # next query files them all again from aim_targets().
+        self.aim_index = PointIndex(self.aim_targets)
+        self.enemy_controller = EnemyController(self)
+        self.flow_field = steering.FlowField(WIDTH, HEIGHT)
+
+        self.player = Player(self)
+        self.player_group = pygame.sprite.Group(self.player)
+        self.enemies_group = EnemyGroup(self.aim_index, self.enemy_controller)
+        self.miniboss_group = TargetGroup(self.aim_index)
+        self.boss_group = TargetGroup(self.aim_index)
+        self.health_potions_group = pygame.sprite.Group()
+        self.speed_boosts_group = pygame.sprite.Group()
+        self.explosions_group = pygame.sprite.Group()
+        self.bombs_group = pygame.sprite.Group()
+
+        # Projectiles are not sprites: one pool for the player's bullets and one for
+        # every hostile shot (enemy, miniboss and boss fire plus explosion waves)
+        self.player_shots = ProjectilePool()
+        self.hostile_shots = ProjectilePool(4096)
+
+        # Broad phase for player bullets against enemies, miniboss and boss
+        self.targets_grid = SpatialHash()
+
+        self.kinds = [
+            Kind("enemies", self.enemies_group, 0, self.update_enemies, contact=self.crash,
+                 shots=((self.player_shots, (projectiles.PLAYER_BULLET,)),
+                        (self.hostile_shots, (projectiles.ENEMY_WAVE,)))),
+            Kind("miniboss", self.miniboss_group, 1, self.update_miniboss, AT_MINIBOSS, contact=self.shove,
+                 shots=((self.hostile_shots, (projectiles.MINIBOSS_WAVE,)),)),
+            Kind("boss", self.boss_group, 2, self.update_boss, AT_BOSS_SHOTS, contact=self.shove,
+                 shots=((self.hostile_shots, (projectiles.BOSS_BULLET,)),)),
+            Kind("health_potions", self.health_potions_group, 3, self.health_potions_group.update, pickup=True),
+            Kind("speed_boosts", self.speed_boosts_group, 4, self.speed_boosts_group.update, pickup=True),
+            Kind("explosions", self.explosions_group, 6, self.explosions_group.update, contact=self.blast,
+                 shots=((self.hostile_shots, (projectiles.BLAST_WAVE,)),)),
+            Kind("bombs", self.bombs_group, 5, self.bombs_group.update, AT_BOMBS),
+        ]
+        # Everything player bullets can hit, in the order hits are dealt out
+        self.target_groups = [kind.group for kind in self.kinds if isinstance(kind.group, TargetGroup)]
+        # Every group that holds something drawn in the arena, in draw order,
+        # and the shots drawn after each
+        self.draw_groups = [kind.group for kind in sorted(self.kinds, key=lambda kind: kind.layer)]
+        self.draw_shots = {kind.group: kind.shots for kind in self.kinds}
+        # Names for profiling and debug output
+        self.group_names = {self.player_group: "player", **{kind.group: kind.name for kind in self.kinds}}
+
+        # Where the moving sprites stood before the last step, so a frontend that runs
+        # the simulation at a fixed rate can draw them part way between two steps
+        self.moving_groups = [self.player_group, self.enemies_group, self.miniboss_group, self.boss_group]
+        self.prev_positions = {}
+
+        # Run state
+        self.game_state = "playing"  # "playing", "victory" or "gameover"
+        self.start_time = self.get_ticks()
+        self.elapsed_time = 0
+        self.kills = 0
+        self.shooting_enabled = False  # set each tick from the timeline
+        self.miniboss_spawned = False
+        self.boss_spawned = False
+
+        # Timing variables
+        self.miniboss_warning_time = 0
+        self.boss_warning_time = 0
+        self.boss_intro_stage = 0
+        self.boss_countdown = 3
+        self.time_frozen = False
+        self.frozen_time = 0
+
+        self.power_up_selection = False
+
+    def get_ticks(self):
+        """Simulated milliseconds, the engine's stand-in for pygame.time.get_ticks()"""
+        return self.frame * 1000 // FPS
+
+    def emit(self, name):
+        self.events.append(name)
+
+    def rules(self):
+        """The options this run is played with; with the seed and inputs they decide everything"""
+        return self.aim_mode, self.enemy_steering, self.enemy_separation
+
+    # --- Auto-aim ---
+    def aim_targets(self):
+        """Every target with its rect center as arrays, for aim_index: the enemies
+        in group order, straight from the controller, then the miniboss and the
+        boss, so ties go to the enemies as they did when Player.shoot listed them"""
+        controller = self.enemy_controller
+        controller.compact()
+        n = len(controller)
+        bosses = list(self.miniboss_group) + list(self.boss_group)
+        if not bosses:
+            return controller.sprites[:], controller.cx[:n].copy(), controller.cy[:n].copy()
+        xs = [boss.rect.centerx for boss in bosses]
+        ys = [boss.rect.centery for boss in bosses]
+        return (controller.sprites + bosses, np.concatenate((controller.cx[:n], xs)),
+                np.concatenate((controller.cy[:n], ys)))
+
+    def pick_target(self, origin):
+        """The target aim_mode picks for a shot from origin, or None when there is none"""
+        aim_mode = self.aim_mode
+        if aim_mode == "weakest" or aim_mode == "threat":
+            near = self.aim_index.within(origin, AIM_RADIUS)
+            if near:
+                if aim_mode == "weakest":
+                    return min(near, key=lambda entry: (entry[0].hp, entry[1]))[0]
+                return max(near, key=lambda entry: threat(entry[0]) / (1 + math.sqrt(entry[1]) / 100))[0]
+        return self.aim_index.nearest(origin)
+
+    def aim_point(self, origin, bullet_speed):
+        """Where a bullet from origin should head, or None when there is nothing to shoot at"""
+        target = self.pick_target(origin)
+        if target is None:
+            return None
+        point = pygame.Vector2(target.rect.center)
+        if self.aim_mode == "lead":
+            # Solve |point + v*t - origin| = bullet_speed*t for the first t > 0
+            v = pygame.Vector2(target.velocity())
+            rel = point - pygame.Vector2(origin)
+            a = v.dot(v) - bullet_speed * bullet_speed
+            b = 2 * rel.dot(v)
+            c = rel.dot(rel)
+            if abs(a) > 1e-9:
+                disc = b * b - 4 * a * c
+                if disc >= 0:
+                    roots = [t for t in ((-b - math.sqrt(disc)) / (2 * a), (-b + math.sqrt(disc)) / (2 * a)) if t > 0]
+                    if roots:
+                        point += v * min(roots)
+        return point
+
+    # --- Contact with the player ---
+    # What touching a sprite of a kind does to the player, given whether the
+    # player is invincible right now
+    def crash(self, group, invincible):
+        """Sprites that die on contact; touching any number of them costs one hit"""
+        player = self.player
+        if pygame.sprite.spritecollide(player, group, True):
+            if not invincible:
+                player.take_damage(1)
+            self.maybe_spawn_drop(player.rect.center)
+
+    def shove(self, group, invincible):
+        """Big sprites that hurt and push the player away"""
+        player = self.player
+        for sprite in pygame.sprite.spritecollide(player, group, False):
+            if not invincible:
+                if player.take_damage(1):  # Only lose 1 HP
+                    dir_away = (player.pos - sprite.pos)
+                    if dir_away.length() > 0:
+                        dir_away = dir_away.normalize()
+                        player.pos += dir_away * 15
+                        player.rect.center = player.pos
+
+    def blast(self, group, invincible):
+        """Explosions hurt within their radius for their first few frames, once per step"""
+        player = self.player
+        for explosion in group:
+            if explosion.timer < 10:  # Only damage during first few frames
+                dist = math.sqrt((player.rect.centerx - explosion.rect.centerx)**2 +
+                                (player.rect.centery - explosion.rect.centery)**2)
+                if dist < explosion.radius and not invincible:
+                    player.take_damage(explosion.damage)
+                    break
+
+    def count_entities(self):
+        """Tell the profiler how many of everything are alive"""
+        for group, name in self.group_names.items():
+            profiler.count(name, len(group))
+        profiler.count("player_shots", len(self.player_shots))
+        profiler.count("hostile_shots", len(self.hostile_shots))
+
+    # --- Interpolation ---
+    def remember_positions(self):
+        prev_positions = self.prev_positions
+        prev_positions.clear()
+        for group in self.moving_groups:
+            for sprite in group:
+                prev_positions[sprite] = sprite.rect.topleft
+
+    def lerp_topleft(self, sprite, t):
+        """Where to draw sprite a fraction t of the way from its previous position to its current one"""
+        x, y = sprite.rect.topleft
+        prev = self.prev_positions.get(sprite)
+        if prev is None or t >= 1:
+            return x, y
+        px, py = prev
+        if abs(x - px) > SNAP_DISTANCE or abs(y - py) > SNAP_DISTANCE:
+            return x, y
+        return round(px + (x - px) * t), round(py + (y - py) * t)
+
+    def pool_stats(self):
+        """Recycling statistics for every pooled entity type"""
+        return {
+            "enemy": self.enemy_pool.stats(),
+            "bomb": self.bomb_pool.stats(),
+            "explosion": self.explosion_pool.stats(),
+            "sonic_explosion": self.sonic_explosion_pool.stats(),
+            "health_potion": self.health_potion_pool.stats(),
+            "speed_boost": self.speed_boost_pool.stats(),
+            "player_shots": self.player_shots.stats(),
+            "hostile_shots": self.hostile_shots.stats(),
+        }
+
+    def maybe_spawn_drop(self, pos):
+        r = self.rng.random()
+        if r < 0.4:
+            self.health_potions_group.add(self.health_potion_pool.acquire(pos))
+        elif r < 0.8:
+            self.speed_boosts_group.add(self.speed_boost_pool.acquire(pos))
+
+    def random_spawn_drops(self):
+        if self.rng.randint(1,300) == 1:
+            self.health_potions_group.add(self.health_potion_pool.acquire())
+        if self.rng.randint(1,400) == 1:
+            self.speed_boosts_group.add(self.speed_boost_pool.acquire())
+
+    def state_digest(self):
+        """A hash of everything the simulation depends on, to check that two runs match"""
+        player = self.player
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr((self.frame, self.game_state, self.elapsed_time, self.kills, player.hp, player.pos.x,
+                       player.pos.y, player.skill_cooldown, self.rng.getstate())).encode())
+        for group in self.draw_groups:
+            for sprite in group:
+                h.update(repr((type(sprite).__name__, tuple(sprite.rect), getattr(sprite, "hp", None))).encode())
+        for shots in (self.player_shots, self.hostile_shots):
+            for name, _ in shots.FIELDS:
+                h.update(getattr(shots, name)[:len(shots)].tobytes())
+        return h.digest()
+
+    def step(self, inputs=NO_INPUT):
+        """Advance the simulation by one frame and return the events it produced"""
+        del self.events[:]
+        if self.game_state != "playing":
+            return self.events
+        self.update_world(inputs)
+        self.resolve_collisions()
+        if profiler.enabled:
+            self.count_entities()
+        return self.events
+
+    def spawned(self, boss):
+        return self.miniboss_spawned if boss == "miniboss" else self.boss_spawned
+
+    def defeated(self, boss):
+        return self.spawned(boss) and len(self.miniboss_group if boss == "miniboss" else self.boss_group) == 0
+
+    def spawn_enemy(self, archetype):
+        enemy = self.enemy_pool.acquire(stationary=archetype.get("stationary", False))
+        for field, value in archetype.items():
+            setattr(enemy, field, value)
+        return enemy
+
+    def offer_power_ups(self):
+        """Cue: the miniboss warning is over, show the power-up selection"""
+        self.power_up_selection = True
+        self.miniboss_warning_time = 0
+
+    def next_boss_intro_stage(self):
+        """Cue: one second of the boss intro has passed"""
+        if self.boss_intro_stage < 2:
+            self.boss_intro_stage += 1
+            self.boss_warning_time = self.get_ticks()
+            self.boss_countdown = 3
+        else:
+            self.boss_countdown -= 1
+            if self.boss_countdown <= 0:
+                self.boss_group.add(Boss(self))
+                self.boss_spawned = True
+                self.time_frozen = False
+                self.boss_warning_time = 0
+                return
+        self.cues.after(FPS, self.next_boss_intro_stage)
+
+    def update_enemies(self):
+        self.enemy_controller.update(self.player.pos, self.hostile_shots, self.shooting_enabled)
+
+    def update_miniboss(self):
+        self.miniboss_group.update(self.player.pos)
+
+    def update_boss(self):
+        self.boss_group.update(self.player.pos)
+
+    def update_world(self, inputs):
+        """First half of a step: inputs, phase changes, spawning and movement"""
+        player = self.player
+        run_timeline = self.timeline
+
+        self.frame += 1
+        self.cues.advance()
+        current_time = self.get_ticks()
+        self.remember_positions()
+
+        if self.power_up_selection:
+            if inputs.power_up:
+                player.apply_power_up(inputs.power_up)
+                self.power_up_selection = False
+                # Continue with miniboss spawn
+                self.miniboss_group.add(MiniBoss(self))
+                self.miniboss_spawned = True
+                self.time_frozen = False
+        else:
+            if inputs.shoot:
+                player.shoot(self.player_shots)
+            if inputs.skill:
+                player.use_skill(self.enemies_group,self.hostile_shots,self.miniboss_group,self.boss_group)
+
+        # The next boss on the timeline, once it is due and the one before it is dead
+        boss = run_timeline.next_boss()
+        while boss is not None and self.spawned(boss.name):  # brought in some other way
+            run_timeline.boss_started()
+            boss = run_timeline.next_boss()
+        if boss is not None and self.elapsed_time >= boss.at and (boss.after is None or self.defeated(boss.after)):
+            run_timeline.boss_started()
+            self.time_frozen = True
+            self.frozen_time = self.elapsed_time
+            if boss.name == "miniboss":
+                # Power-up selection before miniboss
+                self.miniboss_warning_time = current_time
+                self.emit("miniboss_incoming")
+                self.cues.after(2 * FPS, self.offer_power_ups)  # 2 second warning
+            else:
+                self.boss_warning_time = current_time
+                self.boss_intro_stage = 0
+                self.emit("boss_incoming")
+                self.cues.after(FPS, self.next_boss_intro_stage)
+
+        # The end of the miniboss warning and the steps of the boss intro
+        self.cues.run()
+
+        if self.miniboss_warning_time > 0 or self.boss_warning_time > 0:
+            self.elapsed_time = self.frozen_time
+
+        if not self.time_frozen and not self.power_up_selection:
+            self.elapsed_time=(current_time-self.start_time)//1000
+
+        # Spawn enemies: every active wave rolls its die, even while time is frozen
+        running = not self.time_frozen and not self.power_up_selection
+        segment = run_timeline.at(self.elapsed_time)
+        for wave in segment.spawns:
+            if self.rng.randint(1, wave.one_in) == 1 and running and not (wave.until_boss and self.spawned(wave.until_boss)):
+                for _ in range(wave.count):
+                    self.enemies_group.add(self.spawn_enemy(wave.archetype))
+
+        if running:
+            self.random_spawn_drops()
+
+        self.shooting_enabled = segment.enemies_shoot and running
+
+        if running:
+            timers = self.timers
+            timers.advance()
+            section = profiler.section
+            with section("update.player"):
+                player.update(inputs)
+            for kind in self.kinds:
+                with section("update." + kind.name):
+                    kind.update()
+                    if kind.timers is not None:
+                        timers.run(kind.timers)
+            with section("update.projectiles"):
+                self.player_shots.update(SCREEN_RECT)
+                self.hostile_shots.update(SCREEN_RECT)
+
+    def shot_down(self, target):
+        """A target's hp ran out: count it, and it may leave a blast and a drop"""
+        pos = target.rect.center
+        target.kill()
+        self.kills += target.score
+        if target.wins:
+            self.game_state = "victory"
+        self.emit("victory" if target.wins else "explosion")
+        if target.death_blast and self.elapsed_time >= 60:
+            explosion = self.sonic_explosion_pool.acquire(pos, target.death_blast, 8)
+            self.explosions_group.add(explosion)
+        self.maybe_spawn_drop(pos)
+
+    def resolve_collisions(self):
+        """Second half of a step: hits, damage, pickups and the end of the run"""
+        player = self.player
+        player_shots = self.player_shots
+        hostile_shots = self.hostile_shots
+        with profiler.section("collide.bullets"):
+            # Bullet collisions: file every target in the grid once, then each bullet
+            # only tests the few sprites sharing its cells
+            spent = []
+            if len(player_shots) and any(self.target_groups):
+                self.targets_grid.rebuild(*self.target_groups)
+                bullet_rects = player_shots.rects()
+            else:
+                bullet_rects = []
+            for i, bullet_rect in enumerate(bullet_rects):
+                hits = [s for s in self.targets_grid.query_collide(bullet_rect) if s.alive()]
+                if not hits:
+                    continue
+                spent.append(i)
+                for group in self.target_groups:
+                    for target in [s for s in hits if group.has(s)]:
+                        target.hp -= 1
+                        if target.hp <= 0:
+                            self.shot_down(target)
+
+            player_shots.remove(spent)
+
+        # Collision handling - FIXED: All projectiles now deal damage properly
+        invincible = self.get_ticks() < player.invincible_end_time
+
+        with profiler.section("collide.hazards"):
+            # Hostile projectiles: one vectorized overlap test, every hit shot is used up
+            hit = hostile_shots.hits(player.rect)
+            if len(hit):
+                kinds = hostile_shots.kind[hit]
+                # Sonic wave collisions (knockback + damage) first
+                for i in hit[kinds == projectiles.BLAST_WAVE].tolist():
+                    if not invincible and player.knockback_timer <= 0:
+                        knockback_dir = player.pos - pygame.Vector2(float(hostile_shots.x[i]), float(hostile_shots.y[i]))
+                        if knockback_dir.length() > 0:
+                            player.apply_knockback(knockback_dir, 15, 20)
+                        player.take_damage(int(hostile_shots.damage[i]))  # Sonic waves now deal damage
+                # Enemy, miniboss and boss bullets - normal damage
+                for i in hit[kinds != projectiles.BLAST_WAVE].tolist():
+                    if not invincible:
+                        player.take_damage(int(hostile_shots.damage[i]))
+                hostile_shots.remove(hit)
+
+            # Enemies, bosses and explosions touching the player
+            for kind in self.kinds:
+                if kind.contact is not None:
+                    kind.contact(kind.group, invincible)
+
+        with profiler.section("collide.pickups"):
+            for kind in self.kinds:
+                if kind.pickup:
+                    for sprite in pygame.sprite.spritecollide(player, kind.group, True):
+                        sprite.picked_up()
+
+        if player.hp<=0 and self.game_state == "playing":
+            self.game_state="gameover"
+            self.emit("gameover")
+
+# --- Runs ---
+run_timeline = None  # the waves and bosses new worlds follow (timeline.py)
+# The world csc.py, replay.py and engine.py play in; reset_game() replaces it
+world = None
+
+def rules():
+    """The options new runs are played with; with the seed and inputs they decide everything"""
+    return aim_mode, enemy_steering, enemy_separation
+
+def set_rules(aim="nearest", steering_mode="direct", separation=False):
+    global aim_mode, enemy_steering, enemy_separation
+    aim_mode, enemy_steering, enemy_separation = aim, steering_mode, separation
+
+def reset_game(seed=None):
+    """Start a fresh run in a new world, seeded with seed (a fresh one if None)"""
+    global world
+    world = GameWorld(seed)
+    return world
+
+# --- Headless runs ---
+def autopilot(world, n):
+    """A very small bot: circle the arena, keep shooting, use the skill when ready"""
+    angle = n * 0.02
+    return Inputs(up=math.sin(angle) < -0.3, down=math.sin(angle) > 0.3,
+                  left=math.cos(angle) < -0.3, right=math.cos(angle) > 0.3,
+                  shoot=n % 8 == 0, skill=world.player.skill_cooldown == 0,
+                  power_up="scatter_shot")
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the game headless as fast as possible")
+    parser.add_argument("--frames", type=int, default=20000, help="maximum frames to simulate")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the first run; later runs count up from it")
+    parser.add_argument("--runs", type=int, default=1, help="play this many runs back to back")
+    parser.add_argument("--pool-stats", action="store_true", help="print object pool statistics at the end")
+    parser.add_argument("--sections", action="store_true", help="time each part of a step and print the breakdown")
+    parser.add_argument("--aim", choices=AIM_MODES, default="nearest", help="auto-aim mode")
+    parser.add_argument("--steering", choices=STEERING_MODES, default="direct", help="how chasing enemies move")
+    parser.add_argument("--separation", action="store_true", help="keep chasing enemies from piling up")
+    parser.add_argument("--timeline", default=timeline.DEFAULT_PATH, help="waves and bosses to play")
+    args = parser.parse_args(argv)
+
+    if args.sections:
+        profiler.enabled = True
+        profiler.window = args.frames
+
+    set_rules(args.aim, args.steering, args.separation)
+    load_timeline(args.timeline)
+    init(headless=True)
+    for run in range(args.runs):
+        world = reset_game(None if args.seed is None else args.seed + run)
+        t0 = time.perf_counter()
+        n = 0
+        while n < args.frames and world.game_state == "playing":
+            world.step(autopilot(world, n))
+            profiler.end_frame()
+            n += 1
+        secs = time.perf_counter() - t0
+        print(f"{n} frames in {secs:.2f}s ({n / max(secs, 1e-9):.0f} FPS) - {world.game_state} at "
+              f"{world.elapsed_time}s, {world.kills} kills, hp {world.player.hp} (seed {world.session_seed})")
+    if args.pool_stats:
+        print(pool.report(world.pool_stats()))
+    if args.sections:
+        print(profiler.report())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Pre-rendered surfaces shared across the game.
+
+Anything that looks the same every time it is drawn (a projectile of a given
+kind, a dimmed copy of a sprite, a scaled HUD icon) is rendered once, kept in
+a SurfaceCache under a key describing its look, and handed out to every user.
+Cached surfaces are shared, so callers must never draw on them.
+
+Animations whose look depends only on their frame number are baked into
+atlases: lists of frames rendered once per set of parameters, which sprites
+index with their timer instead of redrawing every frame.
+
+Text is rendered through text(), which keeps the most recently used strings in
+a bounded TextCache so a HUD line is only re-rendered when it changes. Fonts
+come from font(), which loads each (name, size) once.
+"""
+from collections import OrderedDict
+
+import pygame
+
+class SurfaceCache:
+    def __init__(self):
+        self.surfaces = {}
+        self.allocations = 0  # surfaces built because the key was new
+        self.hits = 0
+
+    def get(self, key, build):
+        """Return the surface for key, calling build() the first time it is asked for"""
+        surf = self.surfaces.get(key)
+        if surf is None:
+            surf = build()
+            self.surfaces[key] = surf
+            self.allocations += len(surf) if isinstance(surf, list) else 1
+        else:
+            self.hits += 1
+        return surf
+
+    def stats(self):
+        return {"surfaces": len(self.surfaces), "allocations": self.allocations, "hits": self.hits}
+
+surfaces = SurfaceCache()
+
+def circles(size, rings, colorkey=(0,0,0)):
+    """A size x size sprite of concentric filled circles, rings = ((color, radius), ...)
+
+    The circles are either fully opaque or fully clear, so a colour-keyed RLE
+    surface looks the same as per-pixel alpha and blits about twice as fast.
+    """
+    def build():
+        surf = pygame.Surface((size, size))
+        surf.fill(colorkey)
+        surf.set_colorkey(colorkey, pygame.RLEACCEL)
+        for color, radius in rings:
+            pygame.draw.circle(surf, color, (size//2, size//2), radius)
+        return surf
+    return surfaces.get(("circles", size, rings), build)
+
+def with_alpha(image, alpha):
+    """A copy of image drawn at a fixed overall alpha"""
+    def build():
+        surf = image.copy()
+        surf.set_alpha(alpha)
+        return surf
+    return surfaces.get(("alpha", image, alpha), build)
+
+def scaled(image, size):
+    """image scaled to size"""
+    return surfaces.get(("scaled", image, size), lambda: pygame.transform.scale(image, size))
+
+def atlas(key, count, draw_frame):
+    """Frames 0..count-1 of an animation, each drawn once by draw_frame(i) and then shared"""
+    return surfaces.get(("atlas",) + key, lambda: [draw_frame(i) for i in range(count)])
+
+# --- Text ---
+fonts = {}
+
+def font(name, size):
+    """The shared Font for (name, size); SysFont is far too slow to call per frame"""
+    f = fonts.get((name, size))
+    if f is None:
+        f = fonts[(name, size)] = pygame.font.SysFont(name, size)
+    return f
+
+class TextCache:
+    """Rendered text surfaces, least recently used dropped first"""
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, font, text, antialias, color):
+        key = (font, text, tuple(color), antialias)
+        surf = self.surfaces.get(key)
+        if surf is None:
+            self.misses += 1
+            surf = self.surfaces[key] = font.render(text, antialias, color)
+            if len(self.surfaces) > self.capacity:
+                self.surfaces.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+        return surf
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"surfaces": len(self.surfaces), "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_rate": self.hits / total if total else 0.0}
+
+text_cache = TextCache()
+
+def text(font, text, antialias, color):
+    """font.render(text, antialias, color), shared through text_cache"""
+    return text_cache.render(font, text, antialias, color)
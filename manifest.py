@@ -0,0 +1,22 @@
+"""Every asset file the game loads, at the size it is used.
+
+The sprite images belong to the engine (engine.IMAGES); the rest are only
+used by the game screen in csc.py.
+"""
+from engine import WIDTH, HEIGHT, IMAGES as SPRITE_IMAGES, LATE_IMAGES
+
+# (name, size, flip_x)
+SCREEN_IMAGES = [
+    ("background.jpg", (WIDTH, HEIGHT), False),
+    ("menu_background.jpg", (WIDTH, HEIGHT), False),
+    ("title.png", (400, 100), False),
+    ("victory.png", (300, 80), False),
+]
+IMAGES = SPRITE_IMAGES + SCREEN_IMAGES
+
+# Sound effects loaded at startup
+SOUNDS = ["shoot.wav", "explosion.wav", "powerup.wav", "hurt.wav", "victory.wav", "gameover.wav"]
+# Streamed by pygame.mixer.music rather than loaded as a Sound
+MUSIC = ["background_music.mp3", "boss_music.wav"]
+# Only needed once the miniboss or boss is on its way; LATE_IMAGES are the bosses
+LATE_MUSIC = ["boss_music.wav"]
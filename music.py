@@ -0,0 +1,95 @@
+"""Streamed music with fades between tracks.
+
+Every track goes through pygame.mixer.music, which decodes a little at a time
+from the file (or from the asset bundle's mapping), so memory use does not
+depend on how long a track is. The mixer streams one track at a time, so
+switching tracks fades the current one out and then fades the new one in
+over fade_ms. update() drives the fades and has to be called every frame.
+pause() and unpause() keep the stream's position and hold any fade where it
+was.
+"""
+import pygame
+
+import assets
+
+class MusicPlayer:
+    def __init__(self, fade_ms=800):
+        self.fade_ms = fade_ms
+        self.track = None  # name of the track playing or fading in
+        self.volume = 1.0  # full volume of that track
+        self.queued = None  # (name, volume, loops) to start once the current track has faded out
+        self.fading = None  # "in", "out" or None
+        self.fade_start = 0  # get_ticks() the fade started at
+        self.fade_from = 0.0  # volume the fade out started at
+        self.paused_at = None
+
+    def play(self, name, volume=1.0, loops=-1):
+        """Fade over to name, unless it is already playing"""
+        if name == self.track and self.fading != "out":
+            return
+        if self.track is None or not pygame.mixer.music.get_busy():
+            self.start(name, volume, loops)
+        else:
+            self.queued = (name, volume, loops)
+            self.fade_out()
+
+    def stop(self):
+        """Fade out whatever is playing"""
+        self.queued = None
+        if self.track is not None:
+            self.fade_out()
+
+    def pause(self):
+        if self.paused_at is None:
+            pygame.mixer.music.pause()
+            self.paused_at = pygame.time.get_ticks()
+
+    def unpause(self):
+        if self.paused_at is not None:
+            pygame.mixer.music.unpause()
+            self.fade_start += pygame.time.get_ticks() - self.paused_at
+            self.paused_at = None
+
+    def start(self, name, volume, loops):
+        self.track = self.fading = None
+        source = assets.manager.music(name)
+        if source is None:
+            return  # Skip if the music file is missing
+        try:
+            pygame.mixer.music.load(source)
+            pygame.mixer.music.set_volume(0.0)
+            pygame.mixer.music.play(loops)
+        except pygame.error:
+            return  # or its format is not supported
+        self.track = name
+        self.volume = volume
+        self.fading = "in"
+        self.fade_start = pygame.time.get_ticks()
+        if self.paused_at is not None:
+            pygame.mixer.music.pause()
+
+    def fade_out(self):
+        if self.fading != "out":
+            self.fade_from = pygame.mixer.music.get_volume()
+            self.fading = "out"
+            self.fade_start = pygame.time.get_ticks()
+
+    def update(self):
+        if self.fading is None or self.paused_at is not None:
+            return
+        t = min((pygame.time.get_ticks() - self.fade_start) / self.fade_ms, 1.0) if self.fade_ms else 1.0
+        if self.fading == "in":
+            pygame.mixer.music.set_volume(self.volume * t)
+            if t == 1.0:
+                self.fading = None
+        else:
+            pygame.mixer.music.set_volume(self.fade_from * (1 - t))
+            if t == 1.0:
+                pygame.mixer.music.stop()
+                pygame.mixer.music.unload()
+                self.track = self.fading = None
+                if self.queued is not None:
+                    self.start(*self.queued)
+                    self.queued = None
+
+music = MusicPlayer()
@@ -0,0 +1,63 @@
+"""Recycling for short-lived sprites.
+
+Enemies, bombs, explosions and drops are spawned and killed constantly. A Pool
+keeps killed instances on a free list and hands them back out through
+reset() instead of building new objects, so long sessions stop churning the
+allocator and the garbage collector.
+
+A pooled class mixes in Pooled and moves its __init__ body into reset(); its
+kill() then returns the sprite to the pool it came from.
+"""
+
+class Pool:
+    def __init__(self, cls, *init_args):
+        self.cls = cls
+        self.init_args = init_args  # passed ahead of the acquire() arguments to new objects only
+        self.free = []
+        self.hits = 0  # acquires served from the free list
+        self.misses = 0  # acquires that had to construct a new object
+        self.live = 0
+        self.high_water = 0
+
+    def acquire(self, *args, **kwargs):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args, **kwargs)
+            self.hits += 1
+        else:
+            obj = self.cls(*self.init_args, *args, **kwargs)
+            obj.pool = self
+            self.misses += 1
+        self.live += 1
+        if self.live > self.high_water:
+            self.high_water = self.live
+        return obj
+
+    def release(self, obj):
+        self.live -= 1
+        self.free.append(obj)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "live": self.live, "free": len(self.free), "high_water": self.high_water}
+
+class Pooled:
+    """Sprite mixin: kill() hands the sprite back to its pool"""
+    pool = None
+
+    def kill(self):
+        # Only the first kill() of a live sprite releases it
+        released = self.pool is not None and self.alive()
+        super().kill()
+        if released:
+            self.pool.release(self)
+
+def report(pools):
+    """Format {name: stats} as a small table"""
+    lines = [f"{'pool':<16} {'hits':>8} {'misses':>7} {'hit %':>6} {'live':>5} {'high':>5}"]
+    for name, s in pools.items():
+        lines.append(f"{name:<16} {s['hits']:>8} {s['misses']:>7} {s['hit_rate'] * 100:>5.1f}% "
+                     f"{s['live']:>5} {s['high_water']:>5}")
+    return "\n".join(lines)
@@ -0,0 +1,151 @@
+"""Per-section timing of the main loop.
+
+Code wraps the parts worth watching in a named section:
+
+    with profiler.section("update.enemies"):
+        enemies_group.update(...)
+
+or, for a long run of code done in order, charges the time since the previous
+lap() to a name:
+
+    profiler.lap()          # start the clock
+    handle_events()
+    profiler.lap("events")
+
+and the loop calls profiler.end_frame() once per frame. While the profiler is
+enabled every section's time is added up for the frame and kept in a rolling
+window, from which stats() gives the average, worst and latest time and the
+last spike. Counts of live entities go in with count(). Hooks registered with
+add_hook() get each finished frame, and stream_csv() writes every sample to a
+file. While disabled, section() hands back a shared no-op context, so the
+instrumentation can stay in place.
+"""
+import csv
+from collections import deque
+from time import perf_counter
+
+class Section:
+    __slots__ = ("profiler", "name", "t0")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, (perf_counter() - self.t0) * 1000)
+
+class NullSection:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+NULL_SECTION = NullSection()
+
+class Profiler:
+    def __init__(self, window=120, spike_factor=3.0, spike_min_ms=1.0):
+        self.enabled = False
+        self.window = window  # frames in the rolling average
+        # A frame is a spike for a section when it took spike_factor times the
+        # section's average, and at least spike_min_ms
+        self.spike_factor = spike_factor
+        self.spike_min_ms = spike_min_ms
+        self.frame = 0
+        self.sections = {}  # name -> reusable Section
+        self.current = {}  # name -> ms spent this frame
+        self.samples = {}  # name -> deque of per-frame ms
+        self.spikes = {}  # name -> (frame, ms) of the last spike
+        self.counts = {}  # name -> entities this frame
+        self.last_lap = perf_counter()
+        self.hooks = []
+        self.csv_file = self.csv_writer = None
+
+    def section(self, name):
+        if not self.enabled:
+            return NULL_SECTION
+        section = self.sections.get(name)
+        if section is None:
+            section = self.sections[name] = Section(self, name)
+        return section
+
+    def add(self, name, ms):
+        if self.enabled:
+            self.current[name] = self.current.get(name, 0.0) + ms
+
+    def lap(self, name=None):
+        """Charge the time since the previous lap to name; without a name just restart the clock"""
+        now = perf_counter()
+        if name is not None:
+            self.add(name, (now - self.last_lap) * 1000)
+        self.last_lap = now
+
+    def count(self, name, n):
+        if self.enabled:
+            self.counts[name] = n
+
+    def add_hook(self, hook):
+        """Call hook(frame, {section: ms}, {name: count}) after every profiled frame"""
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        self.frame += 1
+        for name, ms in self.current.items():
+            window = self.samples.get(name)
+            if window is None:
+                window = self.samples[name] = deque(maxlen=self.window)
+            if len(window) >= 10 and ms >= self.spike_min_ms and ms > self.spike_factor * sum(window) / len(window):
+                self.spikes[name] = (self.frame, ms)
+            window.append(ms)
+        for hook in self.hooks:
+            hook(self.frame, self.current, self.counts)
+        if self.csv_writer is not None:
+            self.csv_writer.writerows((self.frame, name, f"{ms:.4f}") for name, ms in self.current.items())
+            self.csv_writer.writerows((self.frame, "count." + name, n) for name, n in self.counts.items())
+        self.current = {}
+        self.counts = {}
+
+    def stats(self):
+        """{section: {"avg", "max", "last", "spike"}} over the rolling window, slowest first"""
+        rows = {}
+        for name, window in self.samples.items():
+            rows[name] = {"avg": sum(window) / len(window), "max": max(window),
+                          "last": window[-1], "spike": self.spikes.get(name)}
+        return dict(sorted(rows.items(), key=lambda item: -item[1]["avg"]))
+
+    def reset(self):
+        self.current = {}
+        self.samples.clear()
+        self.spikes.clear()
+        self.counts = {}
+
+    # --- CSV ---
+    def stream_csv(self, path):
+        """Write a (frame, section, ms) row per section and a (frame, count.name, n) row
+        per entity count for every profiled frame to path"""
+        self.close_csv()
+        self.csv_file = open(path, "w", newline="")
+        self.csv_writer = csv.writer(self.csv_file)
+        self.csv_writer.writerow(("frame", "section", "value"))
+
+    def close_csv(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = self.csv_writer = None
+
+    def report(self):
+        """stats() as a small table"""
+        lines = [f"{'section':<24} {'avg ms':>8} {'max ms':>8}"]
+        for name, s in self.stats().items():
+            lines.append(f"{name:<24} {s['avg']:>8.3f} {s['max']:>8.3f}")
+        return "\n".join(lines)
+
+profiler = Profiler()
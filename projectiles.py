@@ -0,0 +1,256 @@
+"""Struct-of-arrays projectile storage.
+
+Every shot in the game (player bullets, sonic waves, boss bullets) lives in a
+ProjectilePool: one NumPy array per field, with the live projectiles packed
+into the first len(pool) slots. Moving, culling and colliding them with the
+player are a handful of array operations per frame instead of one Python
+update() per sprite, which keeps tens of thousands of shots within budget.
+
+A shot behaves as the sprite it replaced did: its position is a float64 like
+a Vector2, and its hitbox and image sit on the whole-pixel rect that a Rect of
+its size centered there would have.
+"""
+from itertools import repeat
+
+import numpy as np
+import pygame
+
+import gfx
+
+# Projectile kinds. They say who fired the shot, which decides how it looks,
+# what it hits and whether the player's skill can clear it.
+PLAYER_BULLET = 0
+ENEMY_WAVE = 1     # sonic wave fired by an Enemy
+MINIBOSS_WAVE = 2  # sonic wave from the MiniBoss 8-way ring
+BLAST_WAVE = 3     # sonic wave thrown out by a SonicExplosion, knocks back
+BOSS_BULLET = 4
+
+# Image size in pixels per kind; the hitbox is the same square
+KIND_SIZE = np.array([8, 12, 12, 12, 10], dtype=np.int16)
+
+SONIC_LOOK = (((0,200,255), 6), ((100,255,255), 3))  # Blue sonic wave with inner circle
+# Concentric circles drawn for each kind, outermost first
+KIND_LOOK = {
+    PLAYER_BULLET: (((255,255,255), 4),),
+    ENEMY_WAVE: SONIC_LOOK,
+    MINIBOSS_WAVE: SONIC_LOOK,
+    BLAST_WAVE: SONIC_LOOK,
+    BOSS_BULLET: (((255,50,50), 5),),
+}
+
+NO_LIFETIME = -1
+
+def rect_round(values):
+    """The whole pixels a pygame.Rect makes of float coordinates: rounded half away from zero"""
+    whole = np.trunc(values)
+    return (whole + np.sign(values) * (np.abs(values - whole) >= 0.5)).astype(np.int64)
+
+def kind_image(kind, alpha=None):
+    """The shared image of one projectile kind, optionally dimmed"""
+    img = gfx.circles(int(KIND_SIZE[kind]), KIND_LOOK[kind])
+    return img if alpha is None else gfx.with_alpha(img, alpha)
+
+def prewarm():
+    """Render every kind up front so firing never builds a surface"""
+    for kind in KIND_LOOK:
+        kind_image(kind)
+
+class ProjectilePool:
+    FIELDS = (("id", np.int64), ("x", np.float64), ("y", np.float64),
+              ("px", np.float64), ("py", np.float64),  # position before the last update()
+              ("vx", np.float64), ("vy", np.float64), ("size", np.int16),
+              ("age", np.int32), ("lifetime", np.int32), ("damage", np.int16),
+              ("kind", np.int8))
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.n = 0
+        self.next_id = 1
+        self.high_water = 0
+        self.grows = 0
+        self.watchers = {}  # projectile id -> (fn, args) to call when it leaves the pool
+        for name, dtype in self.FIELDS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    def __len__(self):
+        return self.n
+
+    def grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        for name, dtype in self.FIELDS:
+            arr = np.zeros(capacity, dtype=dtype)
+            arr[:self.n] = getattr(self, name)[:self.n]
+            setattr(self, name, arr)
+        self.capacity = capacity
+        self.grows += 1
+
+    # --- Spawning ---
+    def spawn(self, kind, pos, direction, speed, lifetime=NO_LIFETIME, damage=1):
+        """Add one projectile and return its id"""
+        if self.n == self.capacity:
+            self.grow(self.n + 1)
+        i = self.n
+        pid = self.next_id
+        self.next_id += 1
+        self.id[i] = pid
+        self.x[i] = self.px[i] = pos[0]; self.y[i] = self.py[i] = pos[1]
+        self.vx[i] = direction[0] * speed; self.vy[i] = direction[1] * speed
+        self.size[i] = KIND_SIZE[kind]
+        self.age[i] = 0
+        self.lifetime[i] = lifetime
+        self.damage[i] = damage
+        self.kind[i] = kind
+        self.n = i + 1
+        if self.n > self.high_water:
+            self.high_water = self.n
+        return pid
+
+    def spawn_many(self, kind, xs, ys, dxs, dys, speed, lifetime=NO_LIFETIME, damage=1):
+        """Add a batch of projectiles of one kind and return their ids"""
+        count = len(xs)
+        if self.n + count > self.capacity:
+            self.grow(self.n + count)
+        s = slice(self.n, self.n + count)
+        ids = np.arange(self.next_id, self.next_id + count, dtype=np.int64)
+        self.next_id += count
+        self.id[s] = ids
+        self.x[s] = self.px[s] = xs; self.y[s] = self.py[s] = ys
+        self.vx[s] = np.asarray(dxs) * speed; self.vy[s] = np.asarray(dys) * speed
+        self.size[s] = KIND_SIZE[kind]
+        self.age[s] = 0
+        self.lifetime[s] = lifetime
+        self.damage[s] = damage
+        self.kind[s] = kind
+        self.n += count
+        if self.n > self.high_water:
+            self.high_water = self.n
+        return ids
+
+    def stats(self):
+        """Same shape as pool.Pool.stats(): a spawn is a miss when the arrays had to grow"""
+        spawned = self.next_id - 1
+        return {"hits": spawned - self.grows, "misses": self.grows,
+                "hit_rate": (spawned - self.grows) / spawned if spawned else 0.0,
+                "live": self.n, "free": self.capacity - self.n, "high_water": self.high_water}
+
+    # --- Removal ---
+    def watch(self, pid, fn, *args):
+        """Call fn(*args) when the projectile leaves the pool, however it goes"""
+        self.watchers[pid] = (fn, args)
+
+    def unwatch(self, pid):
+        self.watchers.pop(pid, None)
+
+    def keep(self, mask):
+        """Compact the pool down to the live projectiles where mask is True"""
+        n = int(np.count_nonzero(mask))
+        if n == self.n:
+            return
+        gone = self.id[:self.n][~mask].tolist() if self.watchers else ()
+        for name, _ in self.FIELDS:
+            arr = getattr(self, name)
+            arr[:n] = arr[:self.n][mask]
+        self.n = n
+        for pid in gone:
+            watcher = self.watchers.pop(pid, None)
+            if watcher is not None:
+                watcher[0](*watcher[1])
+
+    def remove(self, indices):
+        if len(indices):
+            mask = np.ones(self.n, dtype=bool)
+            mask[indices] = False
+            self.keep(mask)
+
+    def index_of(self, pid):
+        """Current slot of a projectile id, or None once it is gone"""
+        found = np.flatnonzero(self.id[:self.n] == pid)
+        return int(found[0]) if len(found) else None
+
+    def position(self, pid):
+        i = self.index_of(pid)
+        return None if i is None else (float(self.x[i]), float(self.y[i]))
+
+    def kill(self, pid):
+        i = self.index_of(pid)
+        if i is not None:
+            self.remove([i])
+
+    def clear(self, kinds=None):
+        """Remove every projectile, or only those of the given kinds"""
+        if kinds is None:
+            self.keep(np.zeros(self.n, dtype=bool))
+        else:
+            self.keep(~np.isin(self.kind[:self.n], kinds))
+
+    # --- Per-frame passes ---
+    def corners(self, x, y):
+        """Left and top of the hitboxes of the first len(x) projectiles centered on x, y"""
+        half = self.size[:len(x)] // 2
+        return rect_round(x) - half, rect_round(y) - half
+
+    def update(self, bounds):
+        """Move everything one frame, then drop shots that left bounds or outlived their lifetime"""
+        n = self.n
+        if not n:
+            return
+        x = self.x[:n]; y = self.y[:n]; size = self.size[:n]
+        self.px[:n] = x; self.py[:n] = y
+        x += self.vx[:n]
+        y += self.vy[:n]
+        left, top = self.corners(x, y)
+        # The update of the frame a shot is fired in does not count towards its lifetime
+        age = self.age[:n]
+        lifetime = self.lifetime[:n]
+        mask = ((left + size > bounds.left) & (left < bounds.right) &
+                (top + size > bounds.top) & (top < bounds.bottom) &
+                ((lifetime < 0) | (age <= lifetime)))
+        age += 1
+        self.keep(mask)
+
+    def hits(self, rect):
+        """Indices of live projectiles whose hitbox overlaps rect"""
+        n = self.n
+        if not n:
+            return np.zeros(0, dtype=np.intp)
+        left, top = self.corners(self.x[:n], self.y[:n])
+        size = self.size[:n]
+        mask = ((left < rect.right) & (left + size > rect.left) &
+                (top < rect.bottom) & (top + size > rect.top))
+        return np.flatnonzero(mask)
+
+    def rects(self):
+        """pygame.Rects for every live projectile, in slot order"""
+        n = self.n
+        left, top = self.corners(self.x[:n], self.y[:n])
+        return [pygame.Rect(l, t, s, s) for l, t, s in zip(left.tolist(), top.tolist(), self.size[:n].tolist())]
+
+    # --- Drawing ---
+    def draw(self, surface, alpha=None, rects=None, t=1.0, kinds=None):
+        """Blit every projectile, or those of the given kinds; if rects is a list,
+        extend it with the areas drawn
+
+        t < 1 draws each shot that far between its previous and current position.
+        """
+        n = self.n
+        if not n:
+            return
+        kind = self.kind[:n]
+        x = self.x[:n]; y = self.y[:n]
+        if t < 1:
+            px = self.px[:n]; py = self.py[:n]
+            x = px + (x - px) * t
+            y = py + (y - py) * t
+        left, top = self.corners(x, y)
+        for k in (np.unique(kind).tolist() if kinds is None else kinds):
+            sel = kind == k
+            lefts = left[sel].tolist()
+            if not lefts:
+                continue
+            img = kind_image(k, alpha)
+            drawn = surface.blits(zip(repeat(img, len(lefts)), zip(lefts, top[sel].tolist())),
+                                  doreturn=rects is not None)
+            if rects is not None:
+                rects.extend(drawn)
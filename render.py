@@ -0,0 +1,130 @@
+"""Screen presentation with optional dirty-rectangle updates.
+
+Each screen has a backdrop: its background plus anything that does not move
+while that screen is up. Every frame the DirtyRenderer draws the moving parts
+on top and records the rect of each draw.
+
+In full mode (the default) it blits the whole backdrop and flips the display,
+like the game always did. In dirty mode it only restores the backdrop under
+last frame's rects and passes last frame's and this frame's rects to
+display.update(), so a title or game over screen where nothing moves costs
+almost nothing.
+
+draw_paused() is the pause screen's part of its backdrop, shared by csc.py
+and the paused scenario in benchmark.py so that one measures the other.
+"""
+import pygame
+
+import gfx
+
+class DirtyRenderer:
+    # Past this many rects a single full update is cheaper than the list
+    MAX_RECTS = 256
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.screen_rect = screen.get_rect()
+        self.enabled = False
+        self.backdrop = pygame.Surface(screen.get_size()).convert()
+        self.backdrop_key = None
+        self.rects = []  # drawn this frame
+        self.last_rects = []  # drawn last frame, erased before drawing this one
+        self.full = True  # redraw and present the whole screen next frame
+        self.updated_pixels = 0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.full = True
+
+    def set_backdrop(self, key, build):
+        """Call build(surface) to draw the static layer whenever key changes"""
+        if key != self.backdrop_key:
+            self.backdrop_key = key
+            build(self.backdrop)
+            self.full = True
+
+    def begin(self):
+        """Erase what the last frame drew"""
+        if self.full or not self.enabled:
+            self.screen.blit(self.backdrop, (0, 0))
+        else:
+            self.screen.blits([(self.backdrop, r, r) for r in self.last_rects], doreturn=False)
+        self.rects = []
+
+    # --- Drawing, recording what changed ---
+    def mark(self, rect):
+        if self.enabled:
+            self.rects.append(rect)
+        return rect
+
+    def blit(self, image, dest, area=None):
+        return self.mark(self.screen.blit(image, dest, area))
+
+    def blits(self, seq):
+        if self.enabled:
+            self.rects.extend(self.screen.blits(seq))
+        else:
+            self.screen.blits(seq, doreturn=False)
+
+    def rect(self, color, rect, width=0):
+        return self.mark(pygame.draw.rect(self.screen, color, rect, width))
+
+    def group(self, group, alpha=None, topleft=None):
+        """Draw every sprite in group, at topleft(sprite) if given instead of its rect"""
+        place = topleft or (lambda sprite: sprite.rect)
+        if alpha is None:
+            self.blits([(sprite.image, place(sprite)) for sprite in group])
+        else:
+            self.blits([(gfx.with_alpha(sprite.image, alpha), place(sprite)) for sprite in group])
+
+    def pool(self, pool, alpha=None, t=1.0, kinds=None):
+        pool.draw(self.screen, alpha, self.rects if self.enabled else None, t, kinds)
+
+    # --- Presenting ---
+    def present(self):
+        area = self.screen_rect.w * self.screen_rect.h
+        if not self.enabled or self.full or len(self.rects) > self.MAX_RECTS:
+            pygame.display.flip()
+            self.updated_pixels = area
+            # Erasing that many rects one by one is slower than a full redraw
+            self.full = self.enabled and len(self.rects) > self.MAX_RECTS
+        else:
+            changed = [r.clip(self.screen_rect) for r in self.last_rects + self.rects]
+            pygame.display.update(changed)
+            self.updated_pixels = sum(r.w * r.h for r in changed)
+        self.last_rects = self.rects
+
+# --- Pause screen ---
+def draw_paused(surface, world):
+    """The frame the game was paused on, dimmed, under the pause menu"""
+    surface.blit(gfx.with_alpha(world.player.image, 60), world.player.rect)
+
+    # Draw all game elements with reduced alpha
+    for group in world.draw_groups:
+        for sprite in group:
+            temp_sprite_img = sprite.image.copy()
+            temp_sprite_img.set_alpha(60)
+            surface.blit(temp_sprite_img, sprite.rect)
+        for shots, kinds in world.draw_shots[group]:
+            shots.draw(surface, alpha=60, kinds=kinds)
+
+    # Semi-transparent overlay
+    width, height = surface.get_size()
+    overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+    overlay.fill((0, 0, 0, 150))
+    surface.blit(overlay, (0, 0))
+
+    # Pause text
+    pause_text = gfx.text(gfx.font(None, 72), "PAUSED", True, (255, 255, 255))
+    surface.blit(pause_text, (width//2 - pause_text.get_width()//2, height//2 - 100))
+
+    # Instructions
+    inst_font = gfx.font(None, 32)
+    instructions = [
+        "Press P to resume",
+        "Press ESC to quit to menu"
+    ]
+
+    for i, text in enumerate(instructions):
+        inst_surface = gfx.text(inst_font, text, True, (200, 200, 200))
+        surface.blit(inst_surface, (width//2 - inst_surface.get_width()//2, height//2 + i * 40))
@@ -0,0 +1,179 @@
+"""Recording and replaying runs.
+
+A run is fully determined by its seed, its rules (GameWorld.rules(): the
+auto-aim mode and how enemies steer), its timeline and the Inputs fed to each
+GameWorld.step(), so that is all a recording holds: the seed, rules and
+timeline, one byte per step,
+the steps at which the game was paused, and a digest of the final engine
+state to check a replay against. Play a game with `python csc.py --record
+run.rec`, then:
+
+    python replay.py play run.rec              # as fast as possible, checks the digest
+    python replay.py play run.rec --profile    # the same under cProfile
+    python replay.py record run.rec --seed 1   # record an autopilot run instead
+"""
+import argparse, struct, time, zlib
+
+import engine
+import timeline
+from engine import Inputs
+
+MAGIC = b"CSCR"
+VERSION = 4
+HEADER = struct.Struct("<4sBQII")  # magic, version, seed, steps, pauses
+AIM = struct.Struct("<B")  # from version 2: the aim mode's index in engine.AIM_MODES
+STEERING = struct.Struct("<B?")  # from version 3: index in engine.STEERING_MODES, separation
+TIMELINE = struct.Struct("<I")  # from version 4: length of the timeline's JSON that follows, 0 for timeline.json
+DIGEST_SIZE = 16
+
+POWER_UPS = (None, "double_shot", "scatter_shot")
+
+def encode(inputs):
+    """Pack one step's Inputs into a byte: four directions, shoot, skill, two bits of power-up"""
+    return (int(inputs.up) | int(inputs.down) << 1 | int(inputs.left) << 2 | int(inputs.right) << 3 |
+            int(inputs.shoot) << 4 | int(inputs.skill) << 5 | POWER_UPS.index(inputs.power_up) << 6)
+
+def decode(byte):
+    power = byte >> 6
+    return Inputs(up=bool(byte & 1), down=bool(byte & 2), left=bool(byte & 4), right=bool(byte & 8),
+                  shoot=bool(byte & 16), skill=bool(byte & 32),
+                  power_up=POWER_UPS[power] if power < len(POWER_UPS) else None)
+
+# Every byte decodes to one shared Inputs, so playback builds nothing per step
+DECODED = [decode(byte) for byte in range(256)]
+
+class Recording:
+    def __init__(self, seed, rules=("nearest", "direct", False), timeline=None):
+        self.seed = seed
+        self.rules = rules
+        self.timeline = timeline  # JSON source of the timeline, None for timeline.json as it is now
+        self.steps = bytearray()
+        self.pauses = []  # number of steps played when P paused the game
+        self.digest = b"\0" * DIGEST_SIZE
+
+    def __len__(self):
+        return len(self.steps)
+
+    def record(self, inputs):
+        self.steps.append(encode(inputs))
+
+    def pause(self):
+        self.pauses.append(len(self.steps))
+
+    def finish(self, world):
+        """Remember the state of the world the recorded steps led to"""
+        self.digest = world.state_digest()
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, len(self.steps), len(self.pauses)))
+            aim, steering, separation = self.rules
+            f.write(AIM.pack(engine.AIM_MODES.index(aim)))
+            f.write(STEERING.pack(engine.STEERING_MODES.index(steering), separation))
+            source = (self.timeline or "").encode("utf-8")
+            f.write(TIMELINE.pack(len(source)))
+            f.write(source)
+            f.write(struct.pack(f"<{len(self.pauses)}I", *self.pauses))
+            f.write(self.digest)
+            f.write(zlib.compress(bytes(self.steps), 9))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, seed, steps, pauses = HEADER.unpack_from(data)
+        if magic != MAGIC or not 1 <= version <= VERSION:
+            raise ValueError(f"{path} is not a recording of version {VERSION} or older")
+        rec = cls(seed)
+        offset = HEADER.size
+        aim, steering, separation = rec.rules
+        if version >= 2:
+            aim = engine.AIM_MODES[AIM.unpack_from(data, offset)[0]]
+            offset += AIM.size
+        if version >= 3:
+            index, separation = STEERING.unpack_from(data, offset)
+            steering = engine.STEERING_MODES[index]
+            offset += STEERING.size
+        rec.rules = (aim, steering, separation)
+        if version >= 4:
+            length, = TIMELINE.unpack_from(data, offset)
+            offset += TIMELINE.size
+            rec.timeline = data[offset:offset + length].decode("utf-8") or None
+            offset += length
+        rec.pauses = list(struct.unpack_from(f"<{pauses}I", data, offset))
+        offset += 4 * pauses
+        rec.digest = data[offset:offset + DIGEST_SIZE]
+        rec.steps = bytearray(zlib.decompress(data[offset + DIGEST_SIZE:]))
+        if len(rec.steps) != steps:
+            raise ValueError(f"{path} is truncated")
+        return rec
+
+def play(rec):
+    """Replay rec headless as fast as possible in a world of its own; returns
+    the world and the seconds it took"""
+    if rec.timeline is None:
+        compiled = timeline.load()
+    else:
+        compiled = timeline.parse(rec.timeline, "the recorded timeline")
+    world = engine.GameWorld(rec.seed, rec.rules, compiled)
+    step = world.step
+    t0 = time.perf_counter()
+    for byte in rec.steps:
+        step(DECODED[byte])
+    return world, time.perf_counter() - t0
+
+def record_autopilot(seed, frames):
+    world = engine.GameWorld(seed)
+    rec = Recording(world.session_seed, world.rules(), world.timeline.source)
+    n = 0
+    while n < frames and world.game_state == "playing":
+        inputs = engine.autopilot(world, n)
+        rec.record(inputs)
+        world.step(inputs)
+        n += 1
+    rec.finish(world)
+    return rec, world
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record and replay Crystal Slime Chronicles runs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("play", help="replay a recording headless and check it matches")
+    p.add_argument("path")
+    p.add_argument("--profile", action="store_true", help="run the replay under cProfile")
+    p = sub.add_parser("record", help="record an autopilot run")
+    p.add_argument("path")
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--frames", type=int, default=20000)
+    p.add_argument("--aim", choices=engine.AIM_MODES, default="nearest", help="auto-aim mode")
+    p.add_argument("--steering", choices=engine.STEERING_MODES, default="direct", help="how chasing enemies move")
+    p.add_argument("--separation", action="store_true", help="keep chasing enemies from piling up")
+    p.add_argument("--timeline", default=timeline.DEFAULT_PATH, help="waves and bosses to play")
+    args = parser.parse_args(argv)
+
+    engine.init(headless=True)
+    if args.command == "record":
+        engine.set_rules(args.aim, args.steering, args.separation)
+        engine.load_timeline(args.timeline)
+        rec, world = record_autopilot(args.seed, args.frames)
+        rec.save(args.path)
+        print(f"recorded {len(rec)} steps, seed {rec.seed}: {world.game_state} at "
+              f"{world.elapsed_time}s, {world.kills} kills")
+        return
+
+    rec = Recording.load(args.path)
+    if args.profile:
+        import cProfile, pstats
+        profiler = cProfile.Profile()
+        world, secs = profiler.runcall(play, rec)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    else:
+        world, secs = play(rec)
+    match = world.state_digest() == rec.digest
+    print(f"{len(rec)} steps in {secs:.2f}s ({len(rec) / max(secs, 1e-9):.0f} steps/s), seed {rec.seed}, "
+          f"rules {'/'.join(str(rule) for rule in rec.rules)}, timeline {world.timeline.name}, "
+          f"{len(rec.pauses)} pauses - {world.game_state} at {world.elapsed_time}s, "
+          f"{world.kills} kills - {'matches' if match else 'DIVERGED from'} the recording")
+    return match
+
+if __name__ == "__main__":
+    main()
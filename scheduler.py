@@ -0,0 +1,84 @@
+"""Timed events on the simulation clock.
+
+A Scheduler keeps every pending Timer in one heap ordered by the tick it is
+due on, so entities that are only waiting for something to happen cost
+nothing per tick: run() pops just what is due, each pop O(log n). Timers due
+on the same tick run by their order number (the step of the tick they belong
+to) and then in the order they were set, which keeps runs reproducible.
+
+after() and at() return the Timer as a handle; cancel() drops it, for things
+that die before their timer comes due. Cancelled timers stay in the heap
+until they reach the top or pile up past half of it.
+"""
+import heapq
+
+class Timer:
+    __slots__ = ("due", "period", "fn", "args")
+
+    def __init__(self, due, period, fn, args):
+        self.due = due  # tick it runs on next
+        self.period = period  # ticks between runs, 0 for a one-shot timer
+        self.fn = fn  # None once cancelled or done
+        self.args = args
+
+    def active(self):
+        return self.fn is not None
+
+class Scheduler:
+    def __init__(self):
+        self.now = 0
+        self.queue = []  # (due, order, seq, Timer)
+        self.seq = 0
+        self.cancelled = 0
+        self.fired = 0
+
+    def __len__(self):
+        return len(self.queue) - self.cancelled
+
+    def advance(self, ticks=1):
+        self.now += ticks
+
+    def at(self, tick, fn, *args, order=0):
+        return self.push(Timer(tick, 0, fn, args), order)
+
+    def after(self, ticks, fn, *args, order=0):
+        return self.at(self.now + ticks, fn, *args, order=order)
+
+    def every(self, period, fn, *args, order=0, delay=None):
+        """Run fn every period ticks, the first time after delay (default: one period)"""
+        return self.push(Timer(self.now + (period if delay is None else delay), period, fn, args), order)
+
+    def push(self, timer, order):
+        heapq.heappush(self.queue, (timer.due, order, self.seq, timer))
+        self.seq += 1
+        return timer
+
+    def cancel(self, timer):
+        """Drop a timer; None and timers that already ran are ignored"""
+        if timer is None or timer.fn is None:
+            return
+        timer.fn = None
+        self.cancelled += 1
+        if self.cancelled > 32 and self.cancelled * 2 > len(self.queue):
+            self.queue[:] = [entry for entry in self.queue if entry[3].fn is not None]
+            heapq.heapify(self.queue)
+            self.cancelled = 0
+
+    def run(self, order=0):
+        """Call every timer due by now, up to and including this order"""
+        queue = self.queue
+        now = self.now
+        while queue and (queue[0][0] < now or queue[0][0] == now and queue[0][1] <= order):
+            due, timer_order, seq, timer = heapq.heappop(queue)
+            fn = timer.fn
+            if fn is None:
+                self.cancelled -= 1
+                continue
+            if timer.period:
+                # Back in line under its first seq, so it keeps its place among timers set after it
+                timer.due = due + timer.period
+                heapq.heappush(queue, (timer.due, timer_order, seq, timer))
+            else:
+                timer.fn = None
+            self.fired += 1
+            fn(*timer.args)
@@ -0,0 +1,198 @@
+"""Broad-phase spatial hashing for sprite collisions.
+
+The arena is split into square cells and every sprite is filed under each
+cell its rect touches. A query only looks at the cells the query rect
+touches, so checking a bullet costs the same with 10 enemies on screen as
+with 1000. PointIndex files points in a grid the same way for auto-aim.
+"""
+import numpy as np
+
+# Enemies are 50x50 and bullets at most 12x12, so a 64px cell keeps almost
+# every query to one or four buckets. The 160px miniboss and 200px boss just
+# get filed under more cells.
+CELL_SIZE = 64
+
+# Below this many points PointIndex keeps them in one cell rather than sort
+# them (see `python benchmark.py aim`)
+GRID_FROM = 150
+
+class SpatialHash:
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def cell_range(self, rect):
+        """Cell coordinates covered by a rect, as (x0, y0, x1, y1) inclusive"""
+        size = self.cell_size
+        return (rect.left // size, rect.top // size,
+                (rect.right - 1) // size, (rect.bottom - 1) // size)
+
+    def insert(self, item, rect):
+        cells = self.cells
+        x0, y0, x1, y1 = self.cell_range(rect)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    cells[(cx, cy)] = [item]
+                else:
+                    bucket.append(item)
+
+    def rebuild(self, *groups):
+        """Clear the grid and file every sprite of the given groups by its rect"""
+        self.cells.clear()
+        for group in groups:
+            for sprite in group:
+                self.insert(sprite, sprite.rect)
+
+    def query(self, rect):
+        """Candidates whose cells overlap rect, each once, without a narrow-phase test"""
+        cells = self.cells
+        x0, y0, x1, y1 = self.cell_range(rect)
+        if x0 == x1 and y0 == y1:
+            return list(cells.get((x0, y0), ()))
+        found = {}
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    for item in bucket:
+                        found[item] = None
+        return list(found)
+
+    def query_collide(self, rect):
+        """Sprites whose rect actually overlaps rect"""
+        return [sprite for sprite in self.query(rect) if rect.colliderect(sprite.rect)]
+
+class PointIndex:
+    """Items found by a point, for nearest-item and items-within-radius
+    queries.
+
+    source() hands over every item with its point, the x and y as integer
+    arrays, and file() bins them all at once: each item's cell number, a
+    stable sort by cell, and where each cell's run of items starts. That is
+    a few array operations however many items there are, so the index is
+    filed again rather than kept up to date item by item: moved() only marks
+    it stale, and the next query files it first.
+
+    Ties between equally near items go to the one source() listed first;
+    the stable sort keeps them in that order within their cell.
+    """
+    def __init__(self, source, cell_size=CELL_SIZE):
+        self.source = source
+        self.cell_size = cell_size
+        self.stale = True
+        self.items = []  # as source() listed them
+        # Every item's point and its index into items, sorted by cell
+        self.x = self.y = self.index = np.zeros(0, dtype=np.int64)
+        self.cols = self.rows = 0
+        self.x0 = self.y0 = 0  # the cell at the grid's top left
+        self.starts = [0]  # x[starts[c]:starts[c + 1]] are in cell c, numbered row by row
+
+    def __len__(self):
+        self.refresh()
+        return len(self.items)
+
+    def moved(self):
+        """Items have come, gone or moved; the next query files them again"""
+        self.stale = True
+
+    def refresh(self):
+        if self.stale:
+            self.file(*self.source())
+
+    def file(self, items, xs, ys):
+        """Bin items at points (xs, ys) into a grid just big enough for them"""
+        self.stale = False
+        self.items = items
+        n = len(items)
+        if n < GRID_FROM:
+            # One cell: a query looks at every item, which is cheaper than sorting a few
+            self.x0 = self.y0 = 0
+            self.cols = self.rows = 1
+            self.starts = [0, n]
+            self.x, self.y, self.index = xs, ys, np.arange(n)
+            return
+        size = self.cell_size
+        gx = xs // size
+        gy = ys // size
+        self.x0 = x0 = int(gx.min())
+        self.y0 = y0 = int(gy.min())
+        self.cols = cols = int(gx.max()) - x0 + 1
+        self.rows = rows = int(gy.max()) - y0 + 1
+        cell = (gy - y0) * cols + (gx - x0)
+        order = np.argsort(cell, kind="stable")
+        self.starts = [0] + np.bincount(cell, minlength=cols * rows).cumsum().tolist()
+        self.x, self.y, self.index = xs[order], ys[order], order
+
+    def cell(self, point):
+        """Grid column and row of a point, which may lie outside the grid"""
+        if self.cols == 1 and self.rows == 1:
+            return 0, 0
+        size = self.cell_size
+        return int(point[0] // size) - self.x0, int(point[1] // size) - self.y0
+
+    def row(self, y, x0, x1):
+        """(start, end) of the points in cells x0..x1 of row y, clipped to the grid"""
+        if not 0 <= y < self.rows:
+            return 0, 0
+        x0 = max(x0, 0)
+        x1 = min(x1, self.cols - 1)
+        if x0 > x1:
+            return 0, 0
+        base = y * self.cols
+        return self.starts[base + x0], self.starts[base + x1 + 1]
+
+    def ring(self, cx, cy, r):
+        """(start, end) runs of the points in cells exactly r cells (Chebyshev) from (cx, cy)"""
+        row = self.row
+        yield row(cy - r, cx - r, cx + r)
+        if r == 0:
+            return
+        yield row(cy + r, cx - r, cx + r)
+        for y in range(max(cy - r + 1, 0), min(cy + r, self.rows)):
+            yield row(y, cx - r, cx - r)
+            yield row(y, cx + r, cx + r)
+
+    def nearest(self, point):
+        """The item closest to point, or None if there are none"""
+        self.refresh()
+        if not self.items:
+            return None
+        x, y, index = self.x, self.y, self.index
+        px, py = point
+        cx, cy = self.cell(point)
+        size = self.cell_size
+        best = None
+        for r in range(max(cx, self.cols - 1 - cx, cy, self.rows - 1 - cy, 0) + 1):
+            # Everything in ring r or beyond is at least r - 1 cells away
+            if best is not None and best[0] < (r - 1) * (r - 1) * size * size:
+                break
+            for start, end in self.ring(cx, cy, r):
+                if start < end:
+                    for ix, iy, i in zip(x[start:end].tolist(), y[start:end].tolist(), index[start:end].tolist()):
+                        key = ((ix - px) ** 2 + (iy - py) ** 2, i)
+                        if best is None or key < best:
+                            best = key
+        return self.items[best[1]]
+
+    def within(self, point, radius):
+        """(item, squared distance) of the items no farther than radius from
+        point, in source()'s order"""
+        self.refresh()
+        if not self.items:
+            return []
+        cx, cy = self.cell(point)
+        reach = int(radius // self.cell_size) + 1
+        runs = [self.row(y, cx - reach, cx + reach) for y in range(max(cy - reach, 0), min(cy + reach + 1, self.rows))]
+        runs = [np.arange(start, end) for start, end in runs if start < end]
+        if not runs:
+            return []
+        k = np.concatenate(runs)
+        d2 = (self.x[k] - point[0]) ** 2 + (self.y[k] - point[1]) ** 2
+        near = d2 <= radius * radius
+        found = self.index[k[near]]
+        d2 = d2[near]
+        by_rank = np.argsort(found)
+        items = self.items
+        return [(items[i], d) for i, d in zip(found[by_rank].tolist(), d2[by_rank].tolist())]
@@ -0,0 +1,97 @@
+"""Steering for crowds of chasing enemies.
+
+FlowField keeps a distance field from the player over a grid of cells and,
+from its slope, the direction to walk in every cell. It is only rebuilt when
+the player moves into another cell, and an enemy finds its way by reading
+the cell it stands in, so a thousand chasers cost a thousand array lookups.
+
+separation() spreads a crowd out without comparing enemies pairwise: it
+counts the enemies in each cell, pushes every enemy away from the middle of
+its own cell's crowd, and down the slope of the crowd density towards
+emptier neighbouring cells.
+"""
+import numpy as np
+
+FLOW_CELL = 32
+SEPARATION_CELL = 48
+
+class FlowField:
+    def __init__(self, width, height, cell_size=FLOW_CELL):
+        self.cell_size = cell_size
+        self.cols = -(-width // cell_size)
+        self.rows = -(-height // cell_size)
+        self.target_cell = None
+        self.distance = np.zeros((self.rows, self.cols))
+        self.dir_x = np.zeros((self.rows, self.cols))
+        self.dir_y = np.zeros((self.rows, self.cols))
+
+    def cells(self, xs, ys):
+        """(column, row) of each point, clamped to the grid"""
+        size = self.cell_size
+        return (np.clip((xs // size).astype(np.intp), 0, self.cols - 1),
+                np.clip((ys // size).astype(np.intp), 0, self.rows - 1))
+
+    def update(self, target):
+        """Rebuild the field if target has moved into another cell"""
+        size = self.cell_size
+        cell = (min(max(int(target[0] // size), 0), self.cols - 1),
+                min(max(int(target[1] // size), 0), self.rows - 1))
+        if cell == self.target_cell:
+            return False
+        self.target_cell = cell
+        self.rebuild(cell)
+        return True
+
+    def rebuild(self, cell):
+        # The arena is open, so every path is a straight line
+        tx, ty = cell
+        cols = np.arange(self.cols) - tx
+        rows = np.arange(self.rows) - ty
+        d = np.hypot(cols[None, :], rows[:, None])
+        self.distance = d
+        # Walk down the slope of the distance field
+        gy, gx = np.gradient(d)
+        length = np.hypot(gx, gy)
+        length[length == 0] = 1.0
+        self.dir_x = -gx / length
+        self.dir_y = -gy / length
+
+    def sample(self, xs, ys, target):
+        """Unit direction to walk from each point; in or next to the target's cell, straight at it"""
+        cx, cy = self.cells(xs, ys)
+        dx = self.dir_x[cy, cx]
+        dy = self.dir_y[cy, cx]
+        tx, ty = self.target_cell
+        close = (np.abs(cx - tx) <= 1) & (np.abs(cy - ty) <= 1)
+        if close.any():
+            ox = target[0] - xs[close]; oy = target[1] - ys[close]
+            length = np.hypot(ox, oy)
+            length[length == 0] = 1.0
+            dx[close] = ox / length
+            dy[close] = oy / length
+        return dx, dy
+
+def separation(xs, ys, width, height, cell_size=SEPARATION_CELL):
+    """A push for each point away from its crowd, roughly unit sized where it is crowded"""
+    cols = -(-width // cell_size) + 2  # plus a border for enemies just off screen
+    rows = -(-height // cell_size) + 2
+    cx = np.clip((xs // cell_size).astype(np.intp) + 1, 0, cols - 1)
+    cy = np.clip((ys // cell_size).astype(np.intp) + 1, 0, rows - 1)
+    flat = cy * cols + cx
+    counts = np.bincount(flat, minlength=rows * cols).astype(np.float64)
+    sum_x = np.bincount(flat, xs, minlength=rows * cols)
+    sum_y = np.bincount(flat, ys, minlength=rows * cols)
+
+    # Within a cell: away from the cell's centre of mass, harder the fuller it is
+    n = counts[flat]
+    push_x = (xs - sum_x[flat] / n) / cell_size * (n - 1)
+    push_y = (ys - sum_y[flat] / n) / cell_size * (n - 1)
+
+    # Between cells: down the slope of the crowd density
+    density = counts.reshape(rows, cols)
+    padded = np.pad(density, 1)
+    blurred = sum(padded[y:y + rows, x:x + cols] for y in range(3) for x in range(3))
+    gy, gx = np.gradient(blurred)
+    push_x -= gx[cy, cx] / 9
+    push_y -= gy[cy, cx] / 9
+    return push_x, push_y
@@ -0,0 +1,157 @@
+"""The waves and bosses of a run, read from a JSON timeline file.
+
+    {
+      "archetypes": {"chaser": {"stationary": false}, ...},
+      "waves": [
+        {"name": "chasers", "from": 0, "until": 60, "spawn": "chaser", "one_in": 60},
+        {"name": "crossfire", "from": 30, "until": 60, "enemies_shoot": true},
+        ...
+      ],
+      "bosses": [{"boss": "miniboss", "at": 60, "hp": 200}, {"boss": "boss", "at": 60, "after": "miniboss"}]
+    }
+
+An archetype sets Enemy attributes: stationary, hp, speed, explodes_on_death.
+A wave is active from its "from" second of run time until its "until" second
+(or for good). While active, a spawning wave rolls a one_in die every tick and
+on a 1 spawns count enemies of its archetype, as long as time is running and
+the boss named in until_boss has not appeared yet. A wave with enemies_shoot
+lets enemies fire while it is active. Bosses come in the order listed, each
+once it is at least "at" seconds into the run and the "after" boss is dead;
+"hp" overrides its hit points (200 for the miniboss, 700 for the boss).
+
+Compiling cuts the run into segments between every from and until second,
+each holding the waves active in it, so a tick only has to check whether
+run time has reached the next segment.
+"""
+import copy, json
+
+DEFAULT_PATH = "timeline.json"
+BOSSES = ("miniboss", "boss")
+ARCHETYPE_FIELDS = {"stationary": bool, "hp": int, "speed": (int, float), "explodes_on_death": bool}
+
+class Wave:
+    __slots__ = ("name", "start", "end", "archetype", "one_in", "count", "until_boss", "enemies_shoot")
+
+    def __init__(self, name, start, end, archetype, one_in, count, until_boss, enemies_shoot):
+        self.name = name
+        self.start = start
+        self.end = end  # None: never ends
+        self.archetype = archetype  # Enemy attributes, or None if the wave spawns nothing
+        self.one_in = one_in
+        self.count = count
+        self.until_boss = until_boss
+        self.enemies_shoot = enemies_shoot
+
+class Segment:
+    __slots__ = ("start", "spawns", "enemies_shoot")
+
+    def __init__(self, start, spawns, enemies_shoot):
+        self.start = start
+        self.spawns = spawns  # active waves that spawn, in file order
+        self.enemies_shoot = enemies_shoot
+
+class Boss:
+    __slots__ = ("name", "at", "after", "hp")
+
+    def __init__(self, name, at, after, hp):
+        self.name = name
+        self.at = at
+        self.after = after
+        self.hp = hp  # None: the boss's own
+
+class Timeline:
+    def __init__(self, data, source, name):
+        self.source = source  # the JSON it was compiled from, which recordings keep
+        self.name = name
+        self.waves = compile_waves(data)
+        self.segments = compile_segments(self.waves)
+        self.bosses = compile_bosses(data)
+        self.restart()
+
+    def restart(self):
+        self.segment = 0
+        self.boss = 0
+
+    def copy(self):
+        """The same compiled timeline with a cursor of its own, at the start"""
+        other = copy.copy(self)
+        other.restart()
+        return other
+
+    def at(self, second):
+        """The Segment for a second of run time; run time never goes back"""
+        segments = self.segments
+        i = self.segment
+        while i + 1 < len(segments) and second >= segments[i + 1].start:
+            i += 1
+        self.segment = i
+        return segments[i]
+
+    def next_boss(self):
+        return self.bosses[self.boss] if self.boss < len(self.bosses) else None
+
+    def boss_started(self):
+        self.boss += 1
+
+    def boss_hp(self, name, default):
+        """Hit points for the boss called name"""
+        for boss in self.bosses:
+            if boss.name == name and boss.hp is not None:
+                return boss.hp
+        return default
+
+def compile_waves(data):
+    archetypes = {}
+    for name, fields in data.get("archetypes", {}).items():
+        for field, value in fields.items():
+            kind = ARCHETYPE_FIELDS.get(field)
+            if kind is None or not isinstance(value, kind):
+                raise ValueError(f"archetype {name}: bad field {field}={value!r}")
+        archetypes[name] = dict(fields)
+    waves = []
+    for i, w in enumerate(data.get("waves", [])):
+        name = w.get("name", f"wave {i}")
+        archetype = None
+        if "spawn" in w:
+            if w["spawn"] not in archetypes:
+                raise ValueError(f"{name}: unknown archetype {w['spawn']!r}")
+            archetype = archetypes[w["spawn"]]
+        start, end = w.get("from", 0), w.get("until")
+        if end is not None and end <= start:
+            raise ValueError(f"{name}: ends before it starts")
+        one_in, count = w.get("one_in", 1), w.get("count", 1)
+        if one_in < 1 or count < 1:
+            raise ValueError(f"{name}: one_in and count must be at least 1")
+        until_boss = w.get("until_boss")
+        if until_boss is not None and until_boss not in BOSSES:
+            raise ValueError(f"{name}: unknown boss {until_boss!r}")
+        waves.append(Wave(name, start, end, archetype, one_in, count, until_boss, bool(w.get("enemies_shoot"))))
+    return waves
+
+def compile_segments(waves):
+    bounds = sorted({0} | {w.start for w in waves} | {w.end for w in waves if w.end is not None})
+    segments = []
+    for start in bounds:
+        active = [w for w in waves if w.start <= start and (w.end is None or start < w.end)]
+        segments.append(Segment(start, tuple(w for w in active if w.archetype is not None),
+                                any(w.enemies_shoot for w in active)))
+    return segments
+
+def compile_bosses(data):
+    bosses = []
+    for b in data.get("bosses", []):
+        name, after = b.get("boss"), b.get("after")
+        if name not in BOSSES or after is not None and after not in BOSSES:
+            raise ValueError(f"unknown boss in {b!r}")
+        hp = b.get("hp")
+        if hp is not None and (not isinstance(hp, int) or hp < 1):
+            raise ValueError(f"{name}: hp must be a whole number of at least 1")
+        bosses.append(Boss(name, b.get("at", 0), after, hp))
+    return bosses
+
+def parse(source, name="<timeline>"):
+    return Timeline(json.loads(source), source, name)
+
+def load(path=DEFAULT_PATH):
+    with open(path, encoding="utf-8") as f:
+        return parse(f.read(), path)